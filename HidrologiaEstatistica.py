@@ -16,8 +16,15 @@
 from __future__ import division
 import numpy as np
 import pandas as pd
+from hidroest.leitura import ler_excel
+try:
+    get_ipython().magic(u'matplotlib inline')
+except NameError:
+    # execução em lote, fora do IPython: figuras sem janela (ver hidroest.relatorio);
+    # o backend precisa ser escolhido antes de importar o pyplot
+    import matplotlib
+    matplotlib.use('Agg')
 from matplotlib import pyplot as plt
-get_ipython().magic(u'matplotlib inline')
 
 
 # # 1 Introdução
@@ -432,7 +439,7 @@ os.getcwd()
 # In[24]:
 
 
-pesos = pd.read_excel('pesos.xlsx', index_col=0)
+pesos = ler_excel('pesos.xlsx', index_col=0)
 pesos
 
 
@@ -528,7 +535,7 @@ print ('A média é de ' + str(chuva_anual30[0].mean()) + ' mm por ano, o desvio
 # In[33]:
 
 
-vazoes = pd.read_excel('vazoes_cuiaba.xlsx', index_col='data')
+vazoes = ler_excel('vazoes_cuiaba.xlsx', index_col='data')
 vazoes_sel = vazoes['1-1-1967':'12-1-1999'].copy()
 print vazoes_sel.head()
 print vazoes_sel.tail()
@@ -554,11 +561,21 @@ ax = vazoes_mes.plot.bar().set_xticklabels(meses, rotation=20)
 # In[35]:
 
 
-vazoes2 = pd.read_excel('vazoes2.xlsx', index_col='Ano')
+vazoes2 = ler_excel('vazoes2.xlsx', index_col='Ano')
 print vazoes2
 vazoes2.describe().mean()
 
 
+# In[ ]:
+
+
+from hidroest.sintetica import ajustar_thomas_fiering, gerar
+parametrosTF = ajustar_thomas_fiering(vazoes, log=True)
+print parametrosTF
+sinteticas = gerar(parametrosTF, anos=100, series=1000, semente=1)
+print sinteticas.reshape(1000, 100, 12).mean(axis=(0, 1))
+
+
 # # 5 A curva de permanência de vazões
 # 
 # A elaboração da curva de permanência é uma das análises estatísticas mais simples e mais úteis na hidrologia. A curva de permanência auxilia na análise dos dados de vazão com relação a perguntas como as destacadas a seguir.
@@ -578,7 +595,7 @@ vazoes2.describe().mean()
 # In[36]:
 
 
-vazoesD_taquari = pd.read_excel('86510000_vazaoD.xlsx', index_col='Data')
+vazoesD_taquari = ler_excel('86510000_vazaoD.xlsx', index_col='Data')
 vazoesD_taquari.plot(figsize=(15,7))
 
 
@@ -592,12 +609,31 @@ NrSup = range(1,NrObs+1)
 # In[38]:
 
 
-CP = vazoesD_taquari.copy()
-CP.sort_values(by='VazaoD', ascending=False, inplace=True)
-CP['NrSup'] = NrSup
-CP['Percent'] = (CP['NrSup']/NrObs)*100
+from hidroest.permanencia import curva_permanencia, vazao_permanencia
+CP = curva_permanencia(vazoesD_taquari)
 print CP.head()
 print CP.tail()
+print vazao_permanencia(vazoesD_taquari, [50, 90, 95])
+
+
+# In[ ]:
+
+
+from hidroest.acervo import criar_acervo
+# acervo mapeado em memória com as séries diárias de várias estações
+acervo = criar_acervo('acervo_diario', {'86510000': '86510000_vazaoD.xlsx',
+                                        'cuiaba': 'vazaoD_Cuiaba.xlsx'})
+print acervo.catalogo
+for estacao in acervo.estacoes:
+    print estacao, vazao_permanencia(acervo.serie(estacao, '1980-01-01', '1984-12-31'), [50, 90, 95])
+
+
+# In[ ]:
+
+
+from hidroest.lote import analisar_rede
+# as mesmas análises para todas as estações do acervo, em paralelo
+print analisar_rede(acervo, ['permanencia', 'maximas', 'lognormal', 'q7_10'], processos=2).T
 
 
 # In[39]:
@@ -639,6 +675,16 @@ CP.plot(x='Percent', y='VazaoD', ax=ax, figsize=(10, 6))
 # 
 # Como o empreendedor solicitou 2,5 m3.s-1 não é possível atender sua solicitação.
 # 
+
+# In[ ]:
+
+
+from hidroest.outorga import ServicoOutorga
+servico = ServicoOutorga({'86510000': '86510000_vazaoD.xlsx', 'cuiaba': 'vazaoD_Cuiaba.xlsx'})
+print servico.referencias()
+print servico.avaliar(['86510000', '86510000', 'cuiaba'], [2.5, 12.0, 15.0])
+
+
 # A curva de permanência também é útil para diferenciar o comportamento de rios e para avaliar o efeito de modificações como desmatamento, reflorestamento, construção de reservatórios e extração de água para uso consuntivo.
 # 
 
@@ -656,6 +702,21 @@ CP.plot(x='Percent', y='VazaoD', ax=ax, figsize=(10, 6))
 
 # Portanto o efeito da regularização da vazão sobre a curva de permanência é torná-la mais horizontal, com valores mais próximos da mediana durante a maior parte do tempo.
 
+# In[ ]:
+
+
+from hidroest.reservatorio import pico_sequencial, simular_operacao
+VazaoReg = vazoesD_taquari['VazaoD']['1-1-1970':'12-31-2019'].interpolate()
+demandas = np.linspace(10, 400, 200)
+volumes = pico_sequencial(VazaoReg, demandas)/1e6
+fig, ax = plt.subplots(figsize=(10,6))
+ax.plot(volumes.values, volumes.index)
+ax.set_xlabel('Volume (hm3)')
+ax.set_ylabel('Vazao regularizada (m3/s)')
+operacao = simular_operacao(VazaoReg, demandas, volumes.values*1e6/2)
+print pd.Series(operacao.garantia, index=demandas).iloc[::20]
+
+
 # # 6 O Box-Plot
 # 
 # O Box plot, também conhecido como gráfico de caixa, é uma forma simples de representar graficamente a faixa de variação de uma variável, bem como algumas características de seu histograma. O Box-plot é uma representação gráfica envolvendo os quartis, a mediana, os valores máximo e mínimo.
@@ -724,7 +785,7 @@ print 'Máximo: ' + str(stats['whishi'])
 # In[42]:
 
 
-dados = pd.read_excel('alt_temp.xlsx')
+dados = ler_excel('alt_temp.xlsx')
 dados.columns = ['est', 'alt', 'tma', 'tmmd']
 dados
 
@@ -749,7 +810,7 @@ dados.plot.scatter('alt', 'tma')
 # In[44]:
 
 
-tabela = pd.read_excel('infiltracao.xlsx')
+tabela = ler_excel('infiltracao.xlsx')
 print tabela
 print
 cross = pd.crosstab(tabela.Taxa, tabela.Solo, values=tabela.Contagem, aggfunc=np.sum, margins=True)
@@ -829,7 +890,7 @@ print nova.round(3) * 100
 # In[46]:
 
 
-dados = pd.read_excel('ventos_ondas.xlsx')
+dados = ler_excel('ventos_ondas.xlsx')
 dados.columns = ['vento', 'alt']
 dados
 
@@ -968,23 +1029,12 @@ ax = sns.regplot(y=dados.alt, x=dados.vento)
 # In[58]:
 
 
-import random
-lance = []
-prob1, prob2 = [],[]
-cara1, cara2 = 0, 0
-for i in range(0, 1000, 1):
-    lance.append(i + 1)
-    teste1 = random.getrandbits(1)
-    if teste1 == 1:
-        cara1 = cara1+1
-    prob1.append(cara1/lance[i])
-    teste2 = random.getrandbits(1)
-    if teste2 == 1:
-        cara2 = cara2+1
-    prob2.append(cara2/lance[i])
+from hidroest.simulacao import frequencia_acumulada
+lance = np.arange(1, 1001)
+prob = frequencia_acumulada(p=0.5, lancamentos=1000, sequencias=2)
 fig, ax = plt.subplots(figsize=(10,8))
-plt.plot(lance, prob1)
-plt.plot(lance, prob2, color = 'r')
+plt.plot(lance, prob[:, 0])
+plt.plot(lance, prob[:, 1], color = 'r')
 
 
 # Nas duas seqüências a proporção varia entre 0,4 e 0,6 por algum tempo e lentamente vai se aproximando de 0,5, a medida que aumenta o número de lançamentos. Isto significa que a proporção lançamentos que resultam em caras é muito variável no começo.
@@ -1213,13 +1263,17 @@ print '%5.2f' %(prob_Mustafah) + '%'
 # In[70]:
 
 
-vazoesD_taquari = pd.read_excel('86510000_vazaoD.xlsx', index_col='Data')
-VazaoDT = vazoesD_taquari['1-1-1970':'12-31-1999'].copy()
-VazaoAMed_taq = VazaoDT.groupby(VazaoDT.index.year).mean()
-VazaoAMax_taq_valor = VazaoDT.groupby(VazaoDT.index.year).max()
-VazaoAMax_taq_data = VazaoDT.groupby(VazaoDT.index.year).idxmax()
-VazaoAMin_taq_valor = VazaoDT.groupby(VazaoDT.index.year).min()
-VazaoAMin_taq_data = VazaoDT.groupby(VazaoDT.index.year).idxmin()
+vazoesD_taquari = ler_excel('86510000_vazaoD.xlsx', index_col='Data')
+from hidroest.serie import SerieDiaria
+# vista float32 do período, sem cópia dos dados
+VazaoDT = SerieDiaria.de_quadro(vazoesD_taquari)['1-1-1970':'12-31-1999']
+from hidroest.extremos import extremos_anuais
+extremos_taq = extremos_anuais(VazaoDT)
+VazaoAMed_taq = extremos_taq.media
+VazaoAMax_taq_valor = extremos_taq.maxima
+VazaoAMax_taq_data = extremos_taq.data_maxima
+VazaoAMin_taq_valor = extremos_taq.minima
+VazaoAMin_taq_data = extremos_taq.data_minima
 
 
 # In[71]:
@@ -1230,7 +1284,7 @@ fig, ax = plt.subplots(figsize=(15,7))
 VazaoAMed_taq.set_index(data, inplace=True)
 plt.plot_date(x=VazaoAMax_taq_data.VazaoD, y=VazaoAMax_taq_valor.VazaoD, marker='o', color='g')
 plt.plot_date(x=VazaoAMin_taq_data.VazaoD, y=VazaoAMin_taq_valor.VazaoD, marker='o', color='r')
-VazaoDT.plot(ax=ax, label='Vazao Diaria')
+VazaoDT.para_quadro().plot(ax=ax, label='Vazao Diaria')
 plt.plot(VazaoAMed_taq.VazaoD, color = 'r')
 ax.legend(["Vazao Anual Maxima", "Vazao Anual Minima", "Vazao Diaria", "Vazao Anual Media"]);
 
@@ -1352,7 +1406,7 @@ print '%5.2f' %(TR) + ' anos'
 
 
 import datetime
-vazoesCuiaba = pd.read_excel('vazaoD_Cuiaba.xlsx', index_col='data')
+vazoesCuiaba = ler_excel('vazaoD_Cuiaba.xlsx', index_col='data')
 vazoes_sel = vazoesCuiaba['1-1-1984':'12-31-1992'].copy()
 VazaoAMax_data = vazoes_sel.groupby(vazoes_sel.index.year).idxmax()
 VazaoAMax = vazoes_sel.groupby(vazoes_sel.index.year).max()
@@ -1392,10 +1446,11 @@ ax = vazoes_mes.plot.bar().set_xticklabels(meses, rotation=40)
 
 
 import datetime
-vazoesCuiaba = pd.read_excel('vazaoD_Cuiaba.xlsx', index_col='data') #index_col='Data')
+vazoesCuiaba = ler_excel('vazaoD_Cuiaba.xlsx', index_col='data') #index_col='Data')
 vazoes_sel = vazoesCuiaba['1-1-1984':'12-31-1992'].copy()
-VazaoAMax_data = vazoes_sel.groupby(vazoes_sel.index.to_period('A-AUG')).idxmax()
-VazaoAMax = vazoes_sel.groupby(vazoes_sel.index.to_period('A-AUG')).max()
+extremos = extremos_anuais(vazoes_sel, mes_inicio=9)
+VazaoAMax_data = extremos.data_maxima
+VazaoAMax = extremos.maxima
 fig, ax = plt.subplots(figsize=(15,7))
 
 plt.plot_date(x=VazaoAMax_data.VazaoD, y=VazaoAMax.VazaoD, marker='o', color='r')
@@ -1414,8 +1469,9 @@ print VazaoAMax
 
 
 vazoes_sel = vazoesCuiaba['1-1-1967':'12-31-1999'].copy()
-VazaoAMax_data = vazoes_sel.groupby(vazoes_sel.index.to_period('A-AUG')).idxmax()
-VazaoAMax = vazoes_sel.groupby(vazoes_sel.index.to_period('A-AUG')).max()
+extremos = extremos_anuais(vazoes_sel, mes_inicio=9)
+VazaoAMax_data = extremos.data_maxima
+VazaoAMax = extremos.maxima
 fig, ax = plt.subplots(figsize=(10,7))
 media = VazaoAMax['VazaoD'].mean()
 desvio = VazaoAMax['VazaoD'].std()
@@ -1434,14 +1490,24 @@ ax = plt.hist(VazaoAMax['logVazao'], bins=10, color='b', normed=True)
 plot_normal(x,VazaoAMax['logVazao'].mean(), VazaoAMax['logVazao'].std(), color='red')
 
 
+# In[ ]:
+
+
+# aderência de todas as distribuições candidatas (KS, Anderson-Darling,
+# qui-quadrado e PPCC) e a de maior valor p do PPCC entre as aceitas, preferindo
+# as de dois parâmetros
+from hidroest.aderencia import aderencia, melhor_distribuicao
+testes_aderencia = aderencia(VazaoAMax['VazaoD'])
+print testes_aderencia
+print melhor_distribuicao(testes_aderencia)
+
+
 # In[79]:
 
 
-VazaoAMax['Rank'] = (VazaoAMax['VazaoD'].size + 1) - VazaoAMax['VazaoD'].rank()
-VazaoAMax.sort_values("Rank", inplace = True)
-VazaoAMax['Prob'] = VazaoAMax['Rank']/(VazaoAMax['VazaoD'].size + 1)
-VazaoAMax['TR'] = 1/VazaoAMax['Prob']
-print VazaoAMax
+from hidroest.posicao import tabela_posicoes
+VazaoAMax = VazaoAMax.join(tabela_posicoes(VazaoAMax['VazaoD']))
+print VazaoAMax.sort_values('Rank')
 
 
 # Para superar este problema existem outras distribuições de probabilidade que são, normalmente, utilizadas para a análise de vazões máximas. A mais simples destas distribuições é a denominada log-normal. Nesta distribuição a suposição é que os logaritmos das vazões seguem uma distribuição normal.
@@ -1476,13 +1542,10 @@ print VazaoAMax
 # In[80]:
 
 
-VazaoMax= pd.read_excel('Linha_Colombo_Max_Anual.xlsx', index_col='ANO')
+VazaoMax= ler_excel('Linha_Colombo_Max_Anual.xlsx', index_col='ANO')
 VazaoMax.dropna(inplace=True)
 VazaoMax['logVazao']=np.log10(VazaoMax['MAXIMA'])
-VazaoMax['Rank'] = (VazaoMax['MAXIMA'].size + 1) - VazaoMax['MAXIMA'].rank()
-VazaoMax.sort_values("Rank", inplace = True)
-VazaoMax['Prob'] = VazaoMax['Rank']/(VazaoMax['MAXIMA'].size + 1)
-VazaoMax['TR'] = 1/VazaoMax['Prob']
+VazaoMax = VazaoMax.join(tabela_posicoes(VazaoMax['MAXIMA']))
 mediaLog = VazaoMax['logVazao'].mean()
 desvioLog = VazaoMax['logVazao'].std()
 Vazao = 10**(ss.norm.ppf(q=0.99, loc=mediaLog, scale=desvioLog))
@@ -1496,25 +1559,13 @@ print '%5.2f' %(Vazao) + ' m3/s'
 # In[81]:
 
 
+from hidroest.frequencia import probabilidade_tr, quantis_normal
 TR = pd.Series(np.arange(2, 1001, 1))
-Prob = pd.Series(np.zeros((999), dtype=np.float64))
-i=0
-for item in TR:
-    teste = 1-(1/item)
-    Prob[i]=(teste)
-    i=i+1
-VazaoNorm = pd.Series(np.zeros((999), dtype=np.float64))
-VazaoLog = pd.Series(np.zeros((999), dtype=np.float64))
+Prob = pd.Series(probabilidade_tr(TR))
 mediaNorm = VazaoMax['MAXIMA'].mean()
 desvioNorm = VazaoMax['MAXIMA'].std()
-i=0
-for item in Prob:
-    VazaoNorm[i] = (ss.norm.ppf(q=item, loc=mediaNorm, scale=desvioNorm))
-    i=i+1
-i=0
-for item in Prob:
-    VazaoLog[i] = 10**(ss.norm.ppf(q=item, loc=mediaLog, scale=desvioLog))
-    i=i+1
+VazaoNorm = pd.Series(quantis_normal(TR, mediaNorm, desvioNorm))
+VazaoLog = pd.Series(quantis_normal(TR, mediaLog, desvioLog, log10=True))
 fig, ax = plt.subplots(figsize=(15,7))
 DF = pd.DataFrame()
 DF['VazaoNorm']=VazaoNorm
@@ -1526,6 +1577,19 @@ VazaoMax.plot.scatter(x='TR', y= 'MAXIMA', ax=ax)
 ax.set_xscale('log')
 
 
+# In[ ]:
+
+
+from hidroest.incerteza import intervalo_quantis
+IC = intervalo_quantis(VazaoMax['MAXIMA'], TR, distribuicao='lognormal', B=10000, nivel=0.90)
+print IC.loc[[10, 50, 100, 500, 1000]]
+fig, ax = plt.subplots(figsize=(15,7))
+ax.fill_between(IC.index, IC['inferior'], IC['superior'], color='#89bedc', alpha=0.5)
+IC['Q'].plot(ax=ax)
+VazaoMax.plot.scatter(x='TR', y= 'MAXIMA', ax=ax)
+ax.set_xscale('log')
+
+
 # Os métodos de estimativa de vazões máximas apresentados neste texto são relativamente simples e a forma de apresentação é resumida. Para realizar análises de vazões máximas mais rigorosas normalmente é necessário testar três ou mais distribuições de probabilidade teóricas, e avaliar qual é a distribuição que melhor se adequa aos dados. Metodologias mais aprofundadas podem ser encontradas em Tucci (1993), Maidment (1993) e Wurbs e James (2001).
 # 
 # ## Vazões mínimas
@@ -1546,31 +1610,19 @@ ax.set_xscale('log')
 # In[82]:
 
 
-VazaoMin= pd.read_excel('PiquiriMinimas.xlsx', index_col='Ano')
-VazaoMin['Rank'] = VazaoMin['Minima'].rank()
-VazaoMin['Rank'] = (VazaoMin['Rank']//1)
-VazaoMin.sort_values("Rank", inplace = True)
-VazaoMin['Prob'] = VazaoMin['Rank']/(VazaoMin['Minima'].size + 1)
-VazaoMin['TR'] = 1/VazaoMin['Prob']
+VazaoMin= ler_excel('PiquiriMinimas.xlsx', index_col='Ano')
+VazaoMin = VazaoMin.join(tabela_posicoes(VazaoMin['Minima'], tipo='minima', empates='min'))
 mediaNorm = VazaoMin['Minima'].mean()
 desvioNorm = VazaoMin['Minima'].std()
-print VazaoMin
+print VazaoMin.sort_values('Rank')
 
 
 # In[83]:
 
 
 TR = pd.Series(np.arange(1, 101, 1))
-Prob = pd.Series(np.zeros((100), dtype=np.float64))
-i=0
-for item in TR:
-    teste = (1/item)
-    Prob[i]=(teste)
-    i=i+1
-i=0
-for item in Prob:
-    VazaoNorm[i] = (ss.norm.ppf(q=item, loc=mediaNorm, scale=desvioNorm))
-    i=i+1    
+Prob = pd.Series(probabilidade_tr(TR, tipo='minima'))
+VazaoNorm = pd.Series(quantis_normal(TR, mediaNorm, desvioNorm, tipo='minima'))
 
 fig, ax = plt.subplots(figsize=(15,7))
 DF = pd.DataFrame()
@@ -1583,7 +1635,17 @@ ax.set_xscale('log')
 
 
 # Normalmente, as análises estatísticas de vazões mínimas são realizadas sobre as vazões mínimas de 7 dias, 15 dias ou 30 dias de duração. Neste caso, para cada ano do registro histórico encontra-se a vazão mínima média de 7 dias (médias móveis de 7 dias). O restante do procedimento de análise é semelhante ao apresentado aqui.
-# 
+
+# In[ ]:
+
+
+from hidroest.extremos import minima_movel_anual, vazao_minima_tr
+VazaoQ7 = pd.DataFrame({'Minima': minima_movel_anual(VazaoDT['VazaoD'], d=7)})
+VazaoQ7 = VazaoQ7.join(tabela_posicoes(VazaoQ7['Minima'], tipo='minima'))
+print VazaoQ7.sort_values('Rank')
+print 'Q7,10: %5.2f m3/s' %(vazao_minima_tr(VazaoQ7['Minima'], TR=10).iloc[0])
+
+
 # ## A distribuição binomial
 # 
 # A distribuição de probabilidades binomial é adequada para avaliar o número (x) de ocorrências de um dado evento em N tentativas.
@@ -1714,12 +1776,14 @@ ss.t.interval(0.90, 4, loc=media, scale=escala)
 # In[87]:
 
 
-coeficientes= pd.read_excel('coeficientes.xlsx', index_col='Medicao')
-media = coeficientes['Coeficiente'].mean()
+# média, desvio e tamanho guardados por suficientes_planilha
+from hidroest.suficientes import suficientes_planilha
+coeficientes = suficientes_planilha('coeficientes.xlsx', colunas=['Coeficiente']).todos
+media = coeficientes.media[0]
 print media
-desvio = coeficientes['Coeficiente'].std(ddof=1)
+desvio = coeficientes.desvio[0]
 print desvio
-escala = desvio/np.sqrt(coeficientes['Coeficiente'].count())
+escala = desvio/np.sqrt(coeficientes.n[0])
 print escala
 ss.t.interval(0.95, 4, loc=media, scale=escala)
 
@@ -1732,12 +1796,12 @@ ss.t.interval(0.95, 4, loc=media, scale=escala)
 # In[88]:
 
 
-diametros= pd.read_excel('diametro.xlsx', index_col='Amostra')
-media = diametros['Diametro'].mean()
+diametros = suficientes_planilha('diametro.xlsx', colunas=['Diametro']).todos
+media = diametros.media[0]
 print media
-desvio = diametros['Diametro'].std(ddof=1)
+desvio = diametros.desvio[0]
 print desvio
-escala = desvio/np.sqrt(diametros['Diametro'].count())
+escala = desvio/np.sqrt(diametros.n[0])
 print escala
 ss.t.interval(0.90, 14, loc=media, scale=escala)
 
@@ -1750,12 +1814,12 @@ ss.t.interval(0.90, 14, loc=media, scale=escala)
 # In[89]:
 
 
-velocidades= pd.read_excel('velocidades.xlsx', index_col='Medicao')
-media = velocidades['Velocidades'].mean()
+velocidades = suficientes_planilha('velocidades.xlsx', colunas=['Velocidades']).todos
+media = velocidades.media[0]
 print media
-desvio = velocidades['Velocidades'].std(ddof=1)
+desvio = velocidades.desvio[0]
 print desvio
-escala = desvio/np.sqrt(velocidades['Velocidades'].count())
+escala = desvio/np.sqrt(velocidades.n[0])
 print escala
 ss.t.interval(0.90, 14, loc=media, scale=escala)
 
@@ -1858,11 +1922,15 @@ ss.t.interval(0.90, 14, loc=media, scale=escala)
 # In[90]:
 
 
-paraopeba= pd.read_excel('VMM_ParaopebaAnoCivil.xlsx')
-# paraopeba['Jul'].describe()
-mediaA=paraopeba['Jul'].mean()
-desvio=paraopeba['Jul'].std()
-N=paraopeba['Jul'].count()
+from hidroest.testes import MESES, bateria
+paraopeba= ler_excel('VMM_ParaopebaAnoCivil.xlsx')
+# estatísticas de cada mês, no período todo e antes e depois de 1968,
+# calculadas uma vez e reaproveitadas pelas células seguintes
+periodos = suficientes_planilha('VMM_ParaopebaAnoCivil.xlsx', colunas=MESES, divisao=1968)
+julho = periodos.todos.tabela().loc['Jul']
+mediaA=julho['media']
+desvio=julho['desvio']
+N=int(julho['n'])
 media = 47.65
 T=abs((mediaA-media)/(desvio/np.sqrt(N)))
 T
@@ -1878,8 +1946,9 @@ print Tcritico
 # In[92]:
 
 
-T = ss.ttest_1samp(paraopeba['Jul'],[media]).statistic[0]
-Pvalor = ss.ttest_1samp(paraopeba['Jul'],[media]).pvalue[0]
+teste = bateria(periodos.todos, media=media, testes=['t']).set_index('coluna').loc['Jul']
+T = teste['estatistica']
+Pvalor = teste['p']
 print T
 print Pvalor
 if Pvalor<0.05:
@@ -1932,11 +2001,9 @@ plt.show()
 # In[94]:
 
 
-paraopeba= pd.read_excel('VMM_ParaopebaAnoCivil.xlsx')
-# paraopeba['Jul'].describe()
-mediaA=paraopeba['Jul'].mean()
+mediaA=julho['media']
 desvio=np.sqrt(153.9183)
-N=paraopeba['Jul'].count()
+N=int(julho['n'])
 media = 47.65
 Z=abs((mediaA-media)/(desvio/np.sqrt(N)))
 Z
@@ -2059,15 +2126,14 @@ plt.show()
 # In[98]:
 
 
-paraopeba = pd.read_excel('VMM_ParaopebaAnoCivil.xlsx')
-X = paraopeba[paraopeba['Ano']<=1968]['Jul']
-Y = paraopeba[paraopeba['Ano']>1968]['Jul']
-mediaX = X.mean()
-mediaY = Y.mean()
-Sx = X.std()
-Sy = Y.std()
-N = X.count()
-M = Y.count()
+X = periodos.antes.tabela().loc['Jul']
+Y = periodos.depois.tabela().loc['Jul']
+mediaX = X['media']
+mediaY = Y['media']
+Sx = X['desvio']
+Sy = Y['desvio']
+N = int(X['n'])
+M = int(Y['n'])
 print mediaX, Sx, N
 print mediaY, Sy, M
 T = abs((mediaX-mediaY)/np.sqrt((Sx**2/N)+(Sy**2/M)))
@@ -2080,7 +2146,9 @@ print Tcritico
 # In[99]:
 
 
-Tteste, Pvalor = ss.ttest_ind(X, Y)
+teste = bateria(periodos, testes=['student']).set_index('coluna').loc['Jul']
+Tteste = teste['estatistica']
+Pvalor = teste['p']
 print Tteste
 print Pvalor
 if Pvalor<0.05:
@@ -2089,6 +2157,45 @@ else:
     print("Aceitar a hipótese nula")
 
 
+# In[ ]:
+
+
+# todos os testes, para todos os meses, a partir das mesmas estatísticas resumo
+testes = bateria(periodos, media=media, desvio=np.sqrt(153.9183), variancia=150)
+print testes.pivot_table(index='coluna', columns='teste', values='p').reindex(MESES)
+
+
+# In[ ]:
+
+
+# estatísticas suficientes dos dois períodos, calculadas uma vez por planilha;
+# as do período todo são a combinação das duas
+from hidroest.testes import testar
+print periodos.todos.tabela()
+print testar(*periodos, testes=['welch', 'f'])
+
+
+# In[ ]:
+
+
+# tendência (Mann-Kendall com correção para autocorrelação, inclinação de Sen)
+# e ponto de mudança (Pettitt) de cada mês, sem escolher o ano de divisão
+from hidroest.tendencia import tendencias
+print tendencias(paraopeba.set_index('Ano')[MESES], autocorrelacao=True)
+print tendencias(VazaoAMax['VazaoD'])
+
+
+# In[ ]:
+
+
+# testes de permutação (sem supor normalidade) da diferença entre os períodos
+from hidroest.permutacao import bateria_permutacao
+permutacoes = bateria_permutacao(paraopeba, divisao=1968,
+                                 estatisticas=['media', 'mediana', 'variancia'],
+                                 semente=1968)
+print permutacoes.pivot_table(index='coluna', columns='teste', values='p').reindex(MESES)
+
+
 # In[100]:
 
 
@@ -2166,10 +2273,9 @@ plt.show()
 # In[101]:
 
 
-paraopeba= pd.read_excel('VMM_ParaopebaAnoCivil.xlsx')
-mediaA=paraopeba['Jul'].mean()
-desvioA=paraopeba['Jul'].std()
-N=paraopeba['Jul'].count()
+mediaA=julho['media']
+desvioA=julho['desvio']
+N=int(julho['n'])
 gl=N-1
 variancaP = 150
 print mediaA, desvioA, N
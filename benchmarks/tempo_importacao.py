@@ -0,0 +1,71 @@
+# coding: utf-8
+"""Tempo de inicialização de um comando que calcula apenas a Q90.
+
+Cada caso roda em um processo novo (o tempo inclui o interpretador e as
+importações) e é repetido algumas vezes; é mostrado o menor tempo. O caso
+"eager" importa no início as dependências pesadas (scipy.stats,
+statsmodels.api e seaborn, as que estiverem instaladas), como acontecia
+quando elas eram importadas no nível dos módulos; o caso "lazy" é o pacote
+atual, que só as importa nas funções que as usam.
+
+Uso: python benchmarks/tempo_importacao.py [planilha] [repeticoes]
+"""
+
+from __future__ import division, print_function
+import os
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADOS = ['scipy.stats', 'statsmodels.api', 'seaborn']
+
+Q90 = """
+import sys
+sys.path.insert(0, %r)
+%s
+from hidroest import ler_excel, vazao_permanencia
+vazoes = ler_excel(%r, index_col=0)['VazaoD']
+vazao_permanencia(vazoes, 90)
+carregados = [m for m in ('scipy', 'statsmodels', 'seaborn', 'matplotlib')
+              if m in sys.modules]
+print(','.join(carregados) or '-')
+"""
+
+
+def _instalado(modulo):
+    return subprocess.call([sys.executable, '-c', 'import ' + modulo],
+                           stderr=subprocess.DEVNULL) == 0
+
+
+def medir(codigo, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        saida = subprocess.check_output([sys.executable, '-c', codigo])
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), saida.decode().strip()
+
+
+def main(planilha=None, repeticoes=5):
+    if planilha is None:
+        planilha = os.path.join(RAIZ, '86510000_vazaoD.xlsx')
+    planilha = os.path.abspath(planilha)
+    pesados = [m for m in PESADOS if _instalado(m)]
+    casos = [('lazy', ''),
+             ('eager', '\n'.join('import ' + m for m in pesados))]
+    # a primeira execução converte a planilha para o cache de leitura
+    medir(Q90 % (RAIZ, '', planilha), 1)
+    resultados = {}
+    for nome, importacoes in casos:
+        tempo, carregados = medir(Q90 % (RAIZ, importacoes, planilha), repeticoes)
+        resultados[nome] = tempo
+        print('%-6s %7.3f s  módulos pesados carregados: %s' % (nome, tempo, carregados))
+    print('ganho: %.3f s (%.1fx)' % (resultados['eager'] - resultados['lazy'],
+                                     resultados['eager'] / resultados['lazy']))
+
+
+if __name__ == '__main__':
+    argumentos = sys.argv[1:]
+    main(argumentos[0] if argumentos else None,
+         int(argumentos[1]) if len(argumentos) > 1 else 5)
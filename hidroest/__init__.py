@@ -0,0 +1,55 @@
+# coding: utf-8
+"""Ferramentas de hidrologia estatística usadas no notebook HidrologiaEstatistica.
+
+Adaptação da apostila do professor Walter Collischonn.
+"""
+
+from hidroest.acervo import AcervoVazoes, criar_acervo
+from hidroest.aderencia import aderencia, criticos_ppcc, melhor_distribuicao, p_ppcc
+from hidroest.distribuicoes import DISTRIBUICOES, METODOS, Ajuste, ajustar
+from hidroest.extremos import (ExtremosAnuais, ano_hidrologico, extremos_anuais,
+                               limites_anos, media_movel, minima_movel_anual,
+                               vazao_minima_tr)
+from hidroest.frequencia import probabilidade_tr, quantis, quantis_normal
+from hidroest.incerteza import intervalo_quantis
+from hidroest.leitura import ler_excel
+from hidroest.lmomentos import lmomentos, lmomentos_agrupados
+from hidroest.lote import ANALISES, analisar_rede
+from hidroest.outorga import REFERENCIAS, ServicoOutorga, vazoes_referencia
+from hidroest.permanencia import (CurvasPermanencia, HistogramaPermanencia,
+                                  curva_permanencia, curvas_permanencia,
+                                  vazao_permanencia)
+from hidroest.permutacao import Permutacao, bateria_permutacao, teste_permutacao
+from hidroest.posicao import PosicoesPlotagem, ordens, posicoes, tabela_posicoes
+from hidroest.relatorio import (calcular_relatorio, figuras_relatorio, relatorio,
+                                salvar_relatorio)
+from hidroest.reservatorio import Operacao, pico_sequencial, simular_operacao
+from hidroest.serie import SerieDiaria
+from hidroest.simulacao import (blocos_frequencia, frequencia_acumulada, geradores,
+                                risco_simulado)
+from hidroest.sintetica import ajustar_thomas_fiering, gerar, gerar_em_arquivo
+from hidroest.suficientes import Periodos, Suficientes, suficientes_planilha
+from hidroest.tendencia import inversoes, mann_kendall, pettitt, sen, tendencias
+from hidroest.testes import ALTERNATIVAS, MESES, TESTES, bateria, testar
+
+__all__ = ['AcervoVazoes', 'criar_acervo',
+           'aderencia', 'criticos_ppcc', 'melhor_distribuicao', 'p_ppcc',
+           'DISTRIBUICOES', 'METODOS', 'Ajuste', 'ajustar',
+           'ExtremosAnuais', 'ano_hidrologico', 'extremos_anuais', 'limites_anos',
+           'media_movel', 'minima_movel_anual', 'vazao_minima_tr',
+           'intervalo_quantis', 'ler_excel', 'lmomentos', 'lmomentos_agrupados',
+           'ANALISES', 'analisar_rede',
+           'probabilidade_tr', 'quantis', 'quantis_normal',
+           'REFERENCIAS', 'ServicoOutorga', 'vazoes_referencia',
+           'CurvasPermanencia', 'HistogramaPermanencia', 'curva_permanencia',
+           'curvas_permanencia', 'vazao_permanencia',
+           'Permutacao', 'bateria_permutacao', 'teste_permutacao',
+           'PosicoesPlotagem', 'ordens', 'posicoes', 'tabela_posicoes',
+           'calcular_relatorio', 'figuras_relatorio', 'relatorio', 'salvar_relatorio',
+           'Operacao', 'pico_sequencial', 'simular_operacao',
+           'SerieDiaria',
+           'blocos_frequencia', 'frequencia_acumulada', 'geradores', 'risco_simulado',
+           'ajustar_thomas_fiering', 'gerar', 'gerar_em_arquivo',
+           'Periodos', 'Suficientes', 'suficientes_planilha',
+           'inversoes', 'mann_kendall', 'pettitt', 'sen', 'tendencias',
+           'ALTERNATIVAS', 'MESES', 'TESTES', 'bateria', 'testar']
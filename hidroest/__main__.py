@@ -0,0 +1,9 @@
+# coding: utf-8
+"""python -m hidroest: ver hidroest.cli."""
+
+import sys
+
+from hidroest.cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
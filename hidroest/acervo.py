@@ -0,0 +1,108 @@
+# coding: utf-8
+"""Acervo de vazões diárias de várias estações em um arranjo mapeado em memória.
+
+As vazões de todas as estações ficam em um único arquivo .npy de forma
+(dias x estações), em float32, com um catálogo JSON ao lado (data inicial,
+frequência e, para cada estação, a planilha de origem e o período com dados).
+O arquivo é aberto com mmap_mode='r': apenas as páginas dos dias e estações
+consultados são lidas do disco, e vários processos que abrem o mesmo acervo
+compartilham as páginas pelo cache do sistema operacional.
+
+As consultas devolvem SerieDiaria, aceita pelas funções de extremos e de
+permanência.
+"""
+
+from __future__ import division
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from hidroest.leitura import ler_excel
+from hidroest.serie import SerieDiaria
+
+ARQUIVO_VAZOES = 'vazoes.npy'
+ARQUIVO_CATALOGO = 'catalogo.json'
+
+
+def criar_acervo(diretorio, arquivos, index_col=0, coluna='VazaoD', freq='D',
+                 dtype=np.float32):
+    """Cria o acervo a partir das planilhas de vazões diárias.
+
+    arquivos relaciona o código de cada estação à sua planilha. O período do
+    acervo vai da primeira à última data de todas as estações; os dias sem
+    dados ficam com NaN. As planilhas são lidas uma de cada vez (com o cache
+    de ler_excel) e gravadas coluna a coluna no arquivo mapeado. Retorna o
+    acervo aberto para leitura.
+    """
+    if not os.path.isdir(diretorio):
+        os.makedirs(diretorio)
+    arquivos = list(dict(arquivos).items())
+
+    def ler(arquivo):
+        vazoes = ler_excel(arquivo, index_col=index_col)[coluna]
+        return SerieDiaria.de_quadro(vazoes.dropna(), dtype, freq)
+
+    # primeira passada: apenas os períodos, para dimensionar o arranjo
+    periodos = [(s.inicio, s.fim) for s in (ler(a) for _, a in arquivos)]
+    inicio = min(p[0] for p in periodos)
+    fim = max(p[1] for p in periodos)
+    indice = pd.date_range(inicio, fim, freq=freq)
+    destino = np.lib.format.open_memmap(os.path.join(diretorio, ARQUIVO_VAZOES),
+                                        mode='w+', dtype=dtype,
+                                        shape=(len(indice), len(arquivos)))
+    destino[:] = np.nan
+    estacoes = []
+    for j, (codigo, arquivo) in enumerate(arquivos):
+        serie = ler(arquivo)
+        a = indice.get_loc(serie.inicio)
+        destino[a:a + len(serie), j] = serie.valores
+        estacoes.append({'codigo': codigo, 'arquivo': arquivo,
+                         'inicio': str(serie.inicio.date()), 'fim': str(serie.fim.date()),
+                         'dias': int(np.count_nonzero(~np.isnan(serie.valores)))})
+    destino.flush()
+    del destino
+    with open(os.path.join(diretorio, ARQUIVO_CATALOGO), 'w') as f:
+        json.dump({'inicio': str(inicio), 'freq': freq, 'estacoes': estacoes}, f,
+                  indent=1)
+    return AcervoVazoes(diretorio)
+
+
+class AcervoVazoes(object):
+    """Acervo aberto para leitura; ver criar_acervo."""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        with open(os.path.join(diretorio, ARQUIVO_CATALOGO)) as f:
+            meta = json.load(f)
+        self.vazoes = np.load(os.path.join(diretorio, ARQUIVO_VAZOES), mmap_mode='r')
+        self.freq = meta['freq']
+        self.catalogo = pd.DataFrame(meta['estacoes']).set_index('codigo')
+        self.estacoes = list(self.catalogo.index)
+        self._todas = SerieDiaria(meta['inicio'], self.vazoes, self.estacoes, self.freq)
+
+    def __len__(self):
+        return len(self.estacoes)
+
+    def __repr__(self):
+        return 'AcervoVazoes(%s, %d estações, %s a %s)' % (
+            self.diretorio, len(self), self._todas.inicio.date(), self._todas.fim.date())
+
+    def serie(self, estacoes=None, inicio=None, fim=None):
+        """Vazões das estações no período indicado (datas inclusive).
+
+        Uma estação (código) resulta em uma vista (dias,) sem cópia; uma lista
+        de estações copia apenas os dias e as estações selecionados.
+        """
+        periodo = self._todas.fatia(inicio, fim)
+        if estacoes is None:
+            return periodo
+        if not isinstance(estacoes, (list, tuple, np.ndarray, pd.Index)):
+            return periodo.coluna(estacoes)
+        j = self.catalogo.index.get_indexer(estacoes)
+        if (j < 0).any():
+            raise KeyError('estações fora do acervo: %s'
+                           % list(pd.Index(estacoes)[j < 0]))
+        return SerieDiaria(periodo.inicio, periodo.valores[:, j], list(estacoes),
+                           self.freq)
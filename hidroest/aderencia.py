@@ -0,0 +1,278 @@
+# coding: utf-8
+"""Testes de aderência das distribuições ajustadas às séries anuais.
+
+Em vez de comparar visualmente o histograma com a densidade ajustada (célula
+In[78]), cada distribuição candidata é testada em todas as estações com as
+estatísticas de Kolmogorov-Smirnov, Anderson-Darling, qui-quadrado (classes
+equiprováveis) e o coeficiente de correlação do papel de probabilidade
+(PPCC). As amostras são ordenadas uma única vez (amostras.ordenar) e o mesmo
+arranjo ordenado, com os logaritmos calculados também uma vez para as
+distribuições log-normal e log-Pearson III, alimenta os quatro testes: os
+valores da função de distribuição acumulada nos dados ordenados servem ao KS,
+ao Anderson-Darling e às contagens do qui-quadrado, e os quantis nas posições
+de plotagem ao PPCC.
+
+Os valores críticos do PPCC dependem da distribuição, do tamanho da amostra
+e, nas distribuições com parâmetro de forma, da forma. Eles são obtidos por
+simulação para os pontos de uma grade de tamanhos (N_CRITICOS) e de formas
+(FORMAS) e guardados em memória: cada ponto é simulado na primeira vez em
+que é necessário e os valores das estações são interpolados entre eles.
+As mesmas amostras simuladas dão o valor p do PPCC de cada estação.
+melhor_distribuicao escolhe a distribuição de cada estação em uma única
+operação sobre a tabela de resultados, pelo valor p e preferindo as
+distribuições de dois parâmetros sempre que alguma delas é aceita.
+"""
+
+from __future__ import division
+
+import numpy as np
+import pandas as pd
+
+from hidroest.amostras import empilhar, ordenar
+from hidroest.distribuicoes import DISTRIBUICOES, _scipy, ajustar
+from hidroest.posicao import FORMULAS
+
+N_CRITICOS = np.array([5, 10, 15, 20, 25, 30, 40, 50, 60, 75, 100, 150, 200, 300,
+                       500, 1000])
+SIMULACOES = 2000
+# parâmetro de forma e grade de valores das tabelas de valores críticos
+FORMAS = {
+    'gev': ('c', np.round(np.arange(-0.5, 0.501, 0.05), 2)),
+    'pearson3': ('skew', np.arange(-3.0, 3.01, 0.25)),
+    'lp3': ('skew', np.arange(-3.0, 3.01, 0.25)),
+    'weibull': ('c', np.round(np.geomspace(0.5, 5.0, 21), 3)),
+}
+# posição de plotagem do PPCC de cada distribuição (padrão: Cunnane)
+POSICOES_PPCC = {'gumbel': 'gringorten', 'gev': 'gringorten'}
+CRITERIOS = {'p_ppcc': True, 'ppcc': True, 'ks': False, 'ad': False, 'qui2': False}
+# limite de F no Anderson-Darling: observações fora do suporte do ajuste
+# (F = 0 ou 1) dariam A² infinito
+LIMITE_F = 1e-12
+
+_CRITICOS = {}
+
+
+def _posicoes(distribuicao, n, linhas):
+    # probabilidades de não excedência das ordens 1..linhas para amostras de
+    # tamanho n (forma linhas x estações)
+    a = FORMULAS[POSICOES_PPCC.get(distribuicao, 'cunnane')]
+    i = np.arange(1, linhas + 1)[:, np.newaxis]
+    return (i - a) / (n + 1 - 2 * a)
+
+
+def _correlacao(x, y, valido):
+    # correlação de Pearson de cada coluna, só nas linhas válidas
+    n = valido.sum(axis=0)
+    x = np.where(valido, x, 0)
+    y = np.where(valido, y, 0)
+    dx = np.where(valido, x - x.sum(axis=0) / n, 0)
+    dy = np.where(valido, y - y.sum(axis=0) / n, 0)
+    return (dx * dy).sum(axis=0) / np.sqrt((dx * dx).sum(axis=0) * (dy * dy).sum(axis=0))
+
+
+def _simulados(distribuicao, forma, N):
+    # PPCC, em ordem crescente, de SIMULACOES amostras simuladas de tamanho N
+    nome = DISTRIBUICOES[distribuicao][0]
+    chave = (nome, POSICOES_PPCC.get(distribuicao, 'cunnane'), forma, N)
+    if chave not in _CRITICOS:
+        dist = _scipy(nome)
+        parametros = {} if forma is None else {FORMAS[distribuicao][0]: forma}
+        rng = np.random.default_rng(N)
+        amostras = np.sort(dist.rvs(size=(N, SIMULACOES), random_state=rng,
+                                    **parametros), axis=0)
+        q = dist.ppf(_posicoes(distribuicao, N, N), **parametros)
+        r = _correlacao(amostras, np.broadcast_to(q, amostras.shape),
+                        np.ones(amostras.shape, dtype=bool))
+        _CRITICOS[chave] = np.sort(r)
+    return _CRITICOS[chave]
+
+
+def _interpolar(distribuicao, n, forma, valor):
+    # valor(simulados, sel) nos dois tamanhos de N_CRITICOS vizinhos de cada
+    # n, interpolado linearmente em n
+    n = np.atleast_1d(np.asarray(n, dtype=np.float64))
+    saida = np.full(n.shape, np.nan)
+    if distribuicao in FORMAS:
+        grade = FORMAS[distribuicao][1]
+        forma = np.broadcast_to(np.asarray(forma, dtype=np.float64), n.shape)
+        no = np.abs(forma[:, np.newaxis] - grade).argmin(axis=1)
+        no = np.where(np.isnan(forma), -1, no)
+    else:
+        grade, no = [None], np.zeros(n.shape, dtype=int)
+    j = np.clip(np.searchsorted(N_CRITICOS, n), 1, len(N_CRITICOS) - 1)
+    n0, n1 = N_CRITICOS[j - 1], N_CRITICOS[j]
+    peso = np.clip((n - n0) / (n1 - n0), 0, 1)
+    for k in np.unique(no[no >= 0]):
+        for jj in np.unique(j[no == k]):
+            sel = (no == k) & (j == jj)
+            v0 = valor(_simulados(distribuicao, grade[k], N_CRITICOS[jj - 1]), sel)
+            v1 = valor(_simulados(distribuicao, grade[k], N_CRITICOS[jj]), sel)
+            saida[sel] = v0 + peso[sel] * (v1 - v0)
+    return saida
+
+
+def criticos_ppcc(distribuicao, n, alfa=0.05, forma=None):
+    """Valores críticos do PPCC ao nível alfa para amostras de tamanho n.
+
+    n (e forma, nas distribuições de FORMAS) podem ser vetores, um valor
+    por estação. A forma é aproximada pelo valor mais próximo da grade e o
+    tamanho é interpolado entre os dois valores vizinhos de N_CRITICOS; só
+    esses pontos da tabela são simulados.
+    """
+    return _interpolar(distribuicao, n, forma, lambda r, sel: np.quantile(r, alfa))
+
+
+def p_ppcc(distribuicao, n, ppcc, forma=None):
+    """Valor p do PPCC: fração das amostras simuladas com PPCC até ppcc.
+
+    Usa as mesmas amostras simuladas e a mesma interpolação de
+    criticos_ppcc; valores p pequenos indicam má aderência.
+    """
+    n = np.atleast_1d(np.asarray(n, dtype=np.float64))
+    ppcc = np.broadcast_to(np.asarray(ppcc, dtype=np.float64), n.shape)
+    p = _interpolar(distribuicao, n, forma, lambda r, sel: (
+        (np.searchsorted(r, ppcc[sel], side='right') + 1) / (len(r) + 1)))
+    return np.where(np.isnan(ppcc), np.nan, p)
+
+
+def _anderson_darling(F, n, valido):
+    # A² = -n - (1/n) soma (2i - 1) [ln F_i + ln(1 - F_(n+1-i))]
+    F = np.clip(F, LIMITE_F, 1 - LIMITE_F)
+    i = np.arange(1, len(F) + 1)[:, np.newaxis]
+    espelho = np.take_along_axis(F, np.clip(n - i, 0, len(F) - 1), axis=0)
+    termos = (2 * i - 1) * (np.log(F) + np.log1p(-espelho))
+    return -n - np.where(valido, termos, 0).sum(axis=0) / n
+
+
+def _p_anderson_darling_normal(A2, n):
+    # média e desvio padrão amostrais (D'Agostino e Stephens, 1986, tabela 4.9)
+    A = A2 * (1 + 0.75 / n + 2.25 / n ** 2)
+    return np.select(
+        [A >= 0.6, A >= 0.34, A >= 0.2],
+        [np.exp(1.2937 - 5.709 * A + 0.0186 * A ** 2),
+         np.exp(0.9177 - 4.279 * A - 1.38 * A ** 2),
+         1 - np.exp(-8.318 + 42.796 * A - 59.938 * A ** 2)],
+        1 - np.exp(-13.436 + 101.14 * A - 223.73 * A ** 2))
+
+
+def _qui_quadrado(F, n, valido, classes, parametros):
+    # classes equiprováveis segundo a distribuição ajustada
+    if classes is None:
+        k = np.clip(n // 5, 3, 20)
+    else:
+        k = np.broadcast_to(classes, n.shape)
+    kmax = int(k.max()) if k.size else 0
+    classe = np.minimum((F * k).astype(np.int64), k - 1)
+    colunas = np.broadcast_to(np.arange(F.shape[1]), F.shape)
+    contagens = np.bincount((colunas * kmax + classe)[valido],
+                            minlength=F.shape[1] * kmax).reshape(F.shape[1], kmax).T
+    esperado = n / k
+    existe = np.arange(kmax)[:, np.newaxis] < k
+    qui2 = np.where(existe, (contagens - esperado) ** 2 / esperado, 0).sum(axis=0)
+    return qui2, k - 1 - parametros
+
+
+def aderencia(amostras, distribuicoes=None, metodo='lmomentos', alfa=0.05,
+              classes=None):
+    """Testes de aderência de cada distribuição em cada estação.
+
+    amostras segue as convenções de amostras.empilhar (uma coluna por
+    estação, por exemplo as vazões máximas anuais). distribuicoes são chaves
+    de DISTRIBUICOES (padrão: todas), ajustadas pelo metodo. classes é o
+    número de classes do qui-quadrado (padrão: n/5, entre 3 e 20).
+
+    Retorna um DataFrame com uma linha por estação e distribuição: n, ks e
+    p_ks (Kolmogorov-Smirnov), ad (A²) e p_ad (só normal e log-normal; o
+    valor p é o da tabela de Stephens, com A² do ajuste por momentos, média e
+    desvio amostrais, qualquer que seja o metodo), fora_suporte (número de
+    observações fora do suporte do ajuste, com F = 0 ou 1, limitado a
+    LIMITE_F no cálculo de A²), qui2, gl_qui2 e p_qui2,
+    ppcc, ppcc_critico (nível alfa) e p_ppcc. Os valores p de KS e
+    qui-quadrado não descontam a estimação dos parâmetros e são, portanto,
+    conservadores.
+    """
+    from scipy import special
+    if distribuicoes is None:
+        distribuicoes = list(DISTRIBUICOES)
+    valores, estacoes = empilhar(amostras)
+    ordenados, n = ordenar(valores)
+    valido = np.arange(len(ordenados))[:, np.newaxis] < n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        logaritmos = np.log10(ordenados)
+    kstwo = _scipy('kstwo')
+    tabelas = []
+    for distribuicao in distribuicoes:
+        nome, nomes, log10 = DISTRIBUICOES[distribuicao]
+        x = logaritmos if log10 else ordenados
+        ajuste = ajustar(ordenados, distribuicao, metodo)
+        parametros = ajuste.parametros
+        dist = _scipy(nome)(**parametros)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            F = np.where(valido, dist.cdf(x), np.nan)
+            i = np.arange(1, len(F) + 1)[:, np.newaxis]
+            D = np.fmax.reduce(np.where(valido, np.fmax(i / n - F, F - (i - 1) / n),
+                                        np.nan), axis=0)
+            A2 = _anderson_darling(F, n, valido)
+            fora = ((F <= 0) | (F >= 1)).sum(axis=0)
+            if distribuicao in ('normal', 'lognormal'):
+                # a tabela de Stephens vale para a média e o desvio amostrais:
+                # com outro metodo, A² é recalculado com o ajuste por momentos
+                A2_momentos = A2
+                if metodo != 'momentos':
+                    momentos = _scipy(nome)(**ajustar(ordenados, distribuicao,
+                                                      'momentos').parametros)
+                    A2_momentos = _anderson_darling(
+                        np.where(valido, momentos.cdf(x), np.nan), n, valido)
+                p_ad = _p_anderson_darling_normal(A2_momentos, n)
+            else:
+                p_ad = np.nan
+            qui2, gl = _qui_quadrado(np.where(valido, F, 0), n, valido, classes,
+                                     len(nomes))
+            q = dist.ppf(_posicoes(distribuicao, n, len(F)))
+            ppcc = _correlacao(x, q, valido)
+        forma = parametros[FORMAS[distribuicao][0]] if distribuicao in FORMAS else None
+        tabela = pd.DataFrame({
+            'distribuicao': distribuicao, 'n': n,
+            'ks': D, 'p_ks': np.where(n > 0, kstwo.sf(D, np.maximum(n, 1)), np.nan),
+            'ad': A2, 'p_ad': p_ad, 'fora_suporte': fora,
+            'qui2': qui2, 'gl_qui2': gl,
+            'p_qui2': np.where(gl > 0, special.chdtrc(np.maximum(gl, 1), qui2), np.nan),
+            'ppcc': ppcc, 'ppcc_critico': criticos_ppcc(distribuicao, n, alfa, forma),
+            'p_ppcc': p_ppcc(distribuicao, n, ppcc, forma)},
+            index=pd.Index(estacoes, name='estacao'))
+        tabelas.append(tabela)
+    return pd.concat(tabelas).reset_index()
+
+
+def melhor_distribuicao(resultado, criterio='p_ppcc', aceitas=True, parcimonia=True):
+    """Distribuição de melhor aderência de cada estação.
+
+    resultado é a tabela de aderencia(). criterio é uma coluna de CRITERIOS
+    (maior valor p ou maior PPCC, ou menor estatística de KS, A² ou
+    qui-quadrado). Com aceitas=True, só concorrem as distribuições com PPCC
+    acima do valor crítico. Como o parâmetro de forma ajustado sempre
+    aproxima os dados do papel de probabilidade, com parcimonia=True as
+    distribuições de três parâmetros só concorrem nas estações em que
+    nenhuma de dois parâmetros é aceita. Retorna uma Series indexada pela
+    estação (NaN se nenhuma distribuição concorre).
+    """
+    if criterio not in CRITERIOS:
+        raise ValueError('criterio deve ser um de %s' % sorted(CRITERIOS))
+    tabela = resultado.pivot(index='estacao', columns='distribuicao', values=criterio)
+    valores = tabela.to_numpy(dtype=np.float64)
+    if not CRITERIOS[criterio]:
+        valores = -valores
+    ppcc = resultado.pivot(index='estacao', columns='distribuicao',
+                           values=['ppcc', 'ppcc_critico'])
+    aceita = (ppcc['ppcc'] >= ppcc['ppcc_critico'])[tabela.columns].to_numpy()
+    if parcimonia:
+        # menor número de parâmetros entre as aceitas (todas, se nenhuma é)
+        k = np.array([len(DISTRIBUICOES[d][1]) for d in tabela.columns])
+        minimo = np.where(aceita, k, np.inf).min(axis=1)[:, np.newaxis]
+        valores = np.where(k <= minimo, valores, np.nan)
+    if aceitas:
+        valores = np.where(aceita, valores, np.nan)
+    valores = np.where(np.isnan(valores), -np.inf, valores)
+    escolha = np.asarray(tabela.columns, dtype=object)[valores.argmax(axis=1)]
+    escolha = np.where(np.isneginf(valores.max(axis=1)), np.nan, escolha)
+    return pd.Series(escolha, index=tabela.index, name='distribuicao')
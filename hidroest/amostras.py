@@ -0,0 +1,62 @@
+# coding: utf-8
+"""Organização de amostras de várias estações em um único arranjo.
+
+As séries anuais das estações raramente têm o mesmo tamanho. Elas são
+empilhadas em um arranjo 2-D (observações x estações) completado com NaN,
+que funciona como máscara para os cálculos vetorizados.
+"""
+
+from __future__ import division
+import numpy as np
+import pandas as pd
+
+
+def empilhar(amostras):
+    """Empilha as amostras em um arranjo 2-D completado com NaN.
+
+    amostras pode ser um DataFrame (uma coluna por estação), uma Series ou
+    vetor 1-D (uma estação), um arranjo 2-D ou um dicionário/lista de vetores
+    de tamanhos diferentes. Retorna (valores, estacoes).
+    """
+    if isinstance(amostras, pd.DataFrame):
+        return amostras.to_numpy(dtype=np.float64), amostras.columns
+    if isinstance(amostras, pd.Series):
+        nome = amostras.name if amostras.name is not None else 0
+        return amostras.to_numpy(dtype=np.float64)[:, np.newaxis], pd.Index([nome])
+    if isinstance(amostras, dict):
+        estacoes = pd.Index(list(amostras.keys()))
+        amostras = list(amostras.values())
+    elif isinstance(amostras, (list, tuple)) and len(amostras) and np.ndim(amostras[0]):
+        estacoes = pd.RangeIndex(len(amostras))
+    else:
+        valores = np.asarray(amostras, dtype=np.float64)
+        if valores.ndim == 1:
+            valores = valores[:, np.newaxis]
+        return valores, pd.RangeIndex(valores.shape[1])
+    tamanho = max(len(a) for a in amostras)
+    valores = np.full((tamanho, len(amostras)), np.nan)
+    for j, a in enumerate(amostras):
+        valores[:len(a), j] = a
+    return valores, estacoes
+
+
+def ordenar(valores):
+    """Ordena cada coluna em ordem crescente (NaN ao final) e conta os válidos."""
+    return np.sort(valores, axis=0), np.count_nonzero(~np.isnan(valores), axis=0)
+
+
+def momentos(valores):
+    """Tamanho, média, desvio padrão e coeficiente de assimetria de cada coluna.
+
+    O desvio padrão usa N-1 no denominador, como pandas.std(), e a assimetria
+    é a estimativa corrigida para o tamanho da amostra.
+    """
+    valido = ~np.isnan(valores)
+    n = np.count_nonzero(valido, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.nansum(valores, axis=0) / n
+        desvio_m = np.where(valido, valores - media, 0)
+        desvio = np.sqrt(np.sum(desvio_m ** 2, axis=0) / (n - 1))
+        assimetria = (n / ((n - 1) * (n - 2)) *
+                      np.sum(desvio_m ** 3, axis=0) / desvio ** 3)
+    return n, media, desvio, assimetria
@@ -0,0 +1,258 @@
+# coding: utf-8
+"""Linha de comando para processar muitas planilhas de uma vez.
+
+    python -m hidroest fdc dados/*.xlsx -o permanencia.csv
+    python -m hidroest maxima dados/ --distribuicao lognormal --tr 10 100
+    python -m hidroest minima dados/ --dias 7 --tr 10
+    python -m hidroest ttest VMM_ParaopebaAnoCivil.xlsx --media 47.65
+
+As entradas podem ser arquivos, padrões glob ou diretórios (todas as .xlsx do
+diretório). Cada planilha é processada por um processo do pool e o resultado
+é gravado assim que fica pronto, na ordem das entradas, com no máximo alguns
+arquivos em andamento por processo: a memória não cresce com o número de
+entradas. A saída é CSV (padrão, ou na saída padrão) ou Parquet (.parquet,
+requer pyarrow). Falhas em uma planilha são informadas e não interrompem as
+demais.
+"""
+
+from __future__ import division, print_function
+import argparse
+import glob
+import os
+import sys
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from hidroest.extremos import COBERTURA_MINIMA
+
+
+def _vazoes(arquivo, opcoes):
+    from hidroest.leitura import ler_excel
+    return ler_excel(arquivo, index_col=opcoes.index_col)[opcoes.coluna]
+
+
+def fdc(arquivo, opcoes):
+    """Pontos da curva de permanência (célula In[38])."""
+    from hidroest.permanencia import curva_permanencia, vazao_permanencia
+    vazoes = _vazoes(arquivo, opcoes)
+    if opcoes.completa:
+        curva = curva_permanencia(vazoes, opcoes.coluna)
+        return pd.DataFrame({'Percent': curva['Percent'].to_numpy(),
+                             'Q': curva[opcoes.coluna].to_numpy()})
+    return pd.DataFrame({'Percent': opcoes.percent,
+                         'Q': vazao_permanencia(vazoes, opcoes.percent)})
+
+
+def _frequencia(serie, tipo, opcoes):
+    from hidroest.distribuicoes import ajustar
+    from hidroest.posicao import tabela_posicoes
+    serie = serie.dropna()
+    if opcoes.anuais:
+        tabela = serie.to_frame('Q').join(tabela_posicoes(serie, tipo=tipo))
+        return tabela.rename_axis('Ano').reset_index()
+    Q = ajustar(serie, opcoes.distribuicao, opcoes.metodo).quantis(opcoes.tr, tipo)[0]
+    return pd.DataFrame({'TR': opcoes.tr, 'Q': Q})
+
+
+def maxima(arquivo, opcoes):
+    """Vazões máximas anuais e quantis por TR (células In[79] a In[81])."""
+    from hidroest.extremos import extremos_anuais
+    vazoes = _vazoes(arquivo, opcoes)
+    maximas = extremos_anuais(vazoes, opcoes.mes_inicio, opcoes.cobertura).maxima
+    return _frequencia(maximas, 'maxima', opcoes)
+
+
+def minima(arquivo, opcoes):
+    """Mínimas anuais de d dias e quantis por TR (células In[82] e In[83])."""
+    from hidroest.extremos import minima_movel_anual
+    vazoes = _vazoes(arquivo, opcoes)
+    minimas = minima_movel_anual(vazoes, opcoes.dias, opcoes.mes_inicio,
+                                 opcoes.cobertura)
+    return _frequencia(minimas, 'minima', opcoes)
+
+
+def ttest(arquivo, opcoes):
+    """Teste t de cada mês de uma tabela mensal (células In[90] a In[99]).
+
+    Exige --media ou --divisao: com --media, teste de uma amostra contra essa
+    média; com --divisao, teste de Welch entre os anos <= divisao e os
+    posteriores.
+    """
+    from hidroest.leitura import ler_excel
+    from hidroest.testes import bateria
+    tabela = ler_excel(arquivo)
+    if opcoes.divisao is None:
+        resultado = bateria(tabela, media=opcoes.media, testes=['t'],
+                            colunas=opcoes.colunas)
+    else:
+        resultado = bateria(tabela, divisao=opcoes.divisao, testes=['welch'],
+                            colunas=opcoes.colunas, coluna_ano=opcoes.coluna_ano)
+    return resultado.drop(columns=['estacao', 'gl2'])
+
+
+COMANDOS = {'fdc': fdc, 'maxima': maxima, 'minima': minima, 'ttest': ttest}
+
+
+def arquivos_entrada(entradas, extensao='.xlsx'):
+    """Expande arquivos, padrões glob e diretórios, sem repetições."""
+    vistos = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            encontrados = sorted(glob.glob(os.path.join(entrada, '*' + extensao)))
+        else:
+            encontrados = sorted(glob.glob(entrada)) or [entrada]
+        for arquivo in encontrados:
+            if arquivo not in vistos and not os.path.basename(arquivo).startswith('~$'):
+                vistos.add(arquivo)
+                yield arquivo
+
+
+def _executar(args):
+    # executado em um processo do pool; a exceção volta como texto
+    comando, arquivo, opcoes = args
+    try:
+        return COMANDOS[comando](arquivo, opcoes), None
+    except Exception as e:
+        return None, '%s: %s' % (type(e).__name__, e)
+
+
+def resultados(comando, arquivos, opcoes, processos=1):
+    """Gera (arquivo, tabela, erro) na ordem dos arquivos.
+
+    Com processos > 1 no máximo 2 * processos arquivos ficam em andamento.
+    """
+    if processos <= 1:
+        for arquivo in arquivos:
+            yield (arquivo,) + _executar((comando, arquivo, opcoes))
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(processos) as pool:
+        pendentes = deque()
+        for arquivo in arquivos:
+            futuro = pool.submit(_executar, (comando, arquivo, opcoes))
+            pendentes.append((arquivo, futuro))
+            if len(pendentes) >= 2 * processos:
+                arquivo, futuro = pendentes.popleft()
+                yield (arquivo,) + futuro.result()
+        while pendentes:
+            arquivo, futuro = pendentes.popleft()
+            yield (arquivo,) + futuro.result()
+
+
+class Saida(object):
+    """Grava as tabelas uma a uma em CSV ou Parquet."""
+
+    def __init__(self, destino):
+        self.destino = destino
+        self.parquet = destino is not None and destino.endswith('.parquet')
+        self._escritor = None
+        self._cabecalho = True
+        if self.parquet:
+            self._arquivo = None
+        elif destino is None or destino == '-':
+            self._arquivo = sys.stdout
+        else:
+            self._arquivo = open(destino, 'w')
+
+    def gravar(self, tabela):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            dados = pa.Table.from_pandas(tabela, preserve_index=False)
+            if self._escritor is None:
+                self._escritor = pq.ParquetWriter(self.destino, dados.schema)
+            self._escritor.write_table(dados.cast(self._escritor.schema))
+        else:
+            tabela.to_csv(self._arquivo, header=self._cabecalho, index=False)
+            self._cabecalho = False
+
+    def fechar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+        if self._arquivo is not None and self._arquivo is not sys.stdout:
+            self._arquivo.close()
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(
+        prog='hidroest', description='Estatísticas hidrológicas em lote.')
+    sub = parser.add_subparsers(dest='comando')
+    sub.required = True
+
+    def comando(nome, ajuda):
+        p = sub.add_parser(nome, help=ajuda)
+        p.add_argument('entradas', nargs='+',
+                       help='planilhas, padrões glob ou diretórios')
+        p.add_argument('-o', '--saida', default=None,
+                       help='arquivo .csv ou .parquet (padrão: saída padrão)')
+        p.add_argument('-j', '--processos', type=int, default=os.cpu_count() or 1)
+        return p
+
+    def diarias(p):
+        p.add_argument('--coluna', default='VazaoD', help='coluna das vazões')
+        p.add_argument('--index-col', default=0,
+                       type=lambda v: int(v) if v.isdigit() else v,
+                       help='coluna de datas (nome ou posição)')
+        p.add_argument('--mes-inicio', type=int, default=1,
+                       help='mês de início do ano hidrológico')
+
+    def frequencia(p, distribuicao, tr):
+        p.add_argument('--distribuicao', default=distribuicao)
+        p.add_argument('--metodo', default='momentos',
+                       choices=['momentos', 'lmomentos', 'mv'])
+        p.add_argument('--tr', type=float, nargs='+', default=tr)
+        p.add_argument('--anuais', action='store_true',
+                       help='grava a série anual com as posições de plotagem')
+        p.add_argument('--cobertura', type=float, default=COBERTURA_MINIMA,
+                       help='fração mínima de dias com dados de um ano '
+                            '(padrão: %(default)s)')
+
+    p = comando('fdc', 'curva de permanência')
+    diarias(p)
+    p.add_argument('--percent', type=float, nargs='+',
+                   default=list(range(5, 100, 5)))
+    p.add_argument('--completa', action='store_true',
+                   help='curva completa em vez dos pontos de --percent')
+    p = comando('maxima', 'vazões máximas anuais e quantis')
+    diarias(p)
+    frequencia(p, 'lognormal', [2, 5, 10, 25, 50, 100])
+    p = comando('minima', 'vazões mínimas de d dias e quantis')
+    diarias(p)
+    p.add_argument('--dias', type=int, default=7)
+    frequencia(p, 'normal', [2, 5, 10, 25])
+    p = comando('ttest', 'teste t de cada mês de tabelas mensais')
+    # sem um dos dois o teste seria, silenciosamente, contra a média 0
+    hipotese = p.add_mutually_exclusive_group(required=True)
+    hipotese.add_argument('--media', type=float, default=None,
+                          help='média da hipótese nula (teste de uma amostra)')
+    hipotese.add_argument('--divisao', type=float, default=None,
+                          help='ano de divisão para o teste de Welch de duas '
+                               'amostras')
+    p.add_argument('--coluna-ano', default='Ano')
+    p.add_argument('--colunas', nargs='+', default=None,
+                   help='colunas testadas (padrão: os meses presentes)')
+    return parser
+
+
+def main(argv=None):
+    opcoes = _argumentos().parse_args(argv)
+    saida = Saida(opcoes.saida)
+    falhas = 0
+    try:
+        for arquivo, tabela, erro in resultados(opcoes.comando,
+                                                arquivos_entrada(opcoes.entradas),
+                                                opcoes, opcoes.processos):
+            if erro is not None:
+                falhas += 1
+                print('%s: %s' % (arquivo, erro), file=sys.stderr)
+                continue
+            tabela.insert(0, 'estacao', os.path.splitext(os.path.basename(arquivo))[0])
+            saida.gravar(tabela)
+    except BrokenPipeError:
+        # a saída padrão foi fechada (por exemplo, por | head)
+        sys.stdout = open(os.devnull, 'w')
+    finally:
+        saida.fechar()
+    return 1 if falhas else 0
@@ -0,0 +1,238 @@
+# coding: utf-8
+"""Ajuste das distribuições de probabilidade usadas na análise de frequência.
+
+Distribuições: normal, log-normal, Gumbel, GEV, Pearson III, log-Pearson III,
+exponencial e Weibull. Métodos: momentos ('momentos'), momentos-L
+('lmomentos') e máxima verossimilhança ('mv').
+
+As amostras de todas as estações são ajustadas juntas, empilhadas em um
+arranjo (anos x estações) completado com NaN (ver amostras.empilhar). Os
+parâmetros seguem as convenções do scipy.stats, de modo que o resultado pode
+ser convertido em distribuições congeladas. As distribuições log-normal e
+log-Pearson III são ajustadas aos logaritmos decimais das vazões, como na
+célula In[80] do notebook.
+"""
+
+from __future__ import division
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from hidroest.amostras import empilhar, momentos, ordenar
+from hidroest.frequencia import quantis
+from hidroest.lmomentos import mpp, razoes
+
+EULER = 0.5772156649015329
+
+# nome: (distribuição do scipy.stats, parâmetros na ordem do scipy, ajuste em
+# log10); o scipy.stats só é importado quando uma distribuição é usada
+DISTRIBUICOES = {
+    'normal': ('norm', ('loc', 'scale'), False),
+    'lognormal': ('norm', ('loc', 'scale'), True),
+    'gumbel': ('gumbel_r', ('loc', 'scale'), False),
+    'gev': ('genextreme', ('c', 'loc', 'scale'), False),
+    'pearson3': ('pearson3', ('skew', 'loc', 'scale'), False),
+    'lp3': ('pearson3', ('skew', 'loc', 'scale'), True),
+    'exponencial': ('expon', ('loc', 'scale'), False),
+    'weibull': ('weibull_min', ('c', 'scale'), False),
+}
+METODOS = ('momentos', 'lmomentos', 'mv')
+
+_TABELAS = {}
+
+
+def _scipy(nome):
+    import scipy.stats as ss
+    return getattr(ss, nome)
+
+
+class Ajuste(namedtuple('Ajuste', ['distribuicao', 'parametros', 'estacoes'])):
+    """Parâmetros ajustados de uma distribuição para várias estações.
+
+    parametros é um dicionário com um vetor por parâmetro do scipy.stats,
+    com um valor por estação.
+    """
+
+    @property
+    def log10(self):
+        return DISTRIBUICOES[self.distribuicao][2]
+
+    def tabela(self):
+        return pd.DataFrame(self.parametros, index=self.estacoes)
+
+    def congelar(self):
+        """Distribuição congelada do scipy com parâmetros de forma (estacoes, 1)."""
+        dist, nomes, _ = DISTRIBUICOES[self.distribuicao]
+        return _scipy(dist)(**dict((p, self.parametros[p][:, np.newaxis]) for p in nomes))
+
+    def quantis(self, TR, tipo='maxima'):
+        """Quantis de todas as estações para os TR (forma estacoes x TR)."""
+        return quantis(TR, self.congelar(), tipo, self.log10)
+
+
+def _tabela_forma(distribuicao):
+    # estatísticas da distribuição padronizada ao longo de uma grade do
+    # parâmetro de forma, usadas para inverter o método dos momentos
+    if distribuicao not in _TABELAS:
+        if distribuicao == 'gev':
+            forma = np.linspace(-0.33, 3.0, 4001)
+            m, v, s = _scipy('genextreme').stats(forma, moments='mvs')
+            chave = s
+        else:
+            forma = np.geomspace(0.05, 50.0, 4001)
+            m, v = _scipy('weibull_min').stats(forma, moments='mv')
+            chave = np.sqrt(v) / m
+        ordem = np.argsort(chave)
+        _TABELAS[distribuicao] = (chave[ordem], forma[ordem], m[ordem], v[ordem])
+    return _TABELAS[distribuicao]
+
+
+def _momentos(nome, x):
+    n, media, desvio, assimetria = momentos(x)
+    if nome in ('normal', 'lognormal'):
+        return {'loc': media, 'scale': desvio}
+    if nome == 'gumbel':
+        escala = desvio * np.sqrt(6) / np.pi
+        return {'loc': media - EULER * escala, 'scale': escala}
+    if nome in ('pearson3', 'lp3'):
+        return {'skew': assimetria, 'loc': media, 'scale': desvio}
+    if nome == 'exponencial':
+        return {'loc': media - desvio, 'scale': desvio}
+    chave, forma, m, v = _tabela_forma(nome)
+    if nome == 'gev':
+        c = np.interp(assimetria, chave, forma)
+        escala = desvio / np.sqrt(np.interp(assimetria, chave, v))
+        return {'c': c, 'loc': media - escala * np.interp(assimetria, chave, m),
+                'scale': escala}
+    cv = desvio / media
+    return {'c': np.interp(cv, chave, forma),
+            'scale': media / np.interp(cv, chave, m)}
+
+
+def _lmomentos(nome, x):
+    from scipy.special import gamma, gammaln
+    ordenados, n = ordenar(x)
+    l1, l2, l3, l4, t3, t4 = razoes(mpp(ordenados, n))
+    if nome in ('normal', 'lognormal'):
+        return {'loc': l1, 'scale': l2 * np.sqrt(np.pi)}
+    if nome == 'gumbel':
+        escala = l2 / np.log(2)
+        return {'loc': l1 - EULER * escala, 'scale': escala}
+    if nome == 'gev':
+        # aproximação de Hosking et al. (1985); k coincide com o c do scipy
+        z = 2 / (3 + t3) - np.log(2) / np.log(3)
+        k = 7.8590 * z + 2.9554 * z ** 2
+        escala = l2 * k / ((1 - 2 ** -k) * gamma(1 + k))
+        return {'c': k, 'loc': l1 - escala * (1 - gamma(1 + k)) / k, 'scale': escala}
+    if nome in ('pearson3', 'lp3'):
+        # aproximação racional de Hosking (1990) para a forma da gama
+        t = np.abs(t3)
+        z1 = 3 * np.pi * t ** 2
+        z2 = 1 - t
+        with np.errstate(invalid='ignore', divide='ignore'):
+            alfa = np.where(
+                t < 1 / 3,
+                (1 + 0.2906 * z1) / (z1 + 0.1882 * z1 ** 2 + 0.0442 * z1 ** 3),
+                (0.36067 * z2 - 0.59567 * z2 ** 2 + 0.25361 * z2 ** 3) /
+                (1 - 2.78861 * z2 + 2.56096 * z2 ** 2 - 0.77045 * z2 ** 3))
+            escala = (l2 * np.sqrt(np.pi * alfa) *
+                      np.exp(gammaln(alfa) - gammaln(alfa + 0.5)))
+            return {'skew': 2 * np.sign(t3) / np.sqrt(alfa), 'loc': l1,
+                    'scale': escala}
+    if nome == 'exponencial':
+        return {'loc': l1 - 2 * l2, 'scale': 2 * l2}
+    c = -np.log(2) / np.log(1 - l2 / l1)
+    return {'c': c, 'scale': l1 / gamma(1 + 1 / c)}
+
+
+def _media_ponderada(y, expoente, valido):
+    # média e variância de y com pesos exp(expoente), ignorando as falhas
+    expoente = np.where(valido, expoente, -np.inf)
+    w = np.exp(expoente - np.max(expoente, axis=0))
+    y = np.where(valido, y, 0)
+    soma = np.sum(w, axis=0)
+    media = np.sum(w * y, axis=0) / soma
+    return media, np.sum(w * y ** 2, axis=0) / soma - media ** 2, soma
+
+
+def _newton(f, x0, iteracoes=100, tol=1e-10):
+    x = x0
+    for _ in range(iteracoes):
+        valor, derivada = f(x)
+        passo = valor / derivada
+        x = x - passo
+        if np.all(~(np.abs(passo) > tol * np.abs(x))):
+            break
+    return x
+
+
+def _mv(nome, x):
+    valido = ~np.isnan(x)
+    n = np.count_nonzero(valido, axis=0)
+    if nome in ('normal', 'lognormal'):
+        media = np.nansum(x, axis=0) / n
+        return {'loc': media,
+                'scale': np.sqrt(np.nansum((x - media) ** 2, axis=0) / n)}
+    if nome == 'exponencial':
+        minimo = np.nanmin(x, axis=0)
+        return {'loc': minimo, 'scale': np.nansum(x, axis=0) / n - minimo}
+    if nome == 'gumbel':
+        media = np.nansum(x, axis=0) / n
+
+        def equacao(beta):
+            m, v, _ = _media_ponderada(x, -x / beta, valido)
+            return beta - media + m, 1 + v / beta ** 2
+
+        beta = _newton(equacao, _lmomentos(nome, x)['scale'])
+        _, _, soma = _media_ponderada(x, -x / beta, valido)
+        maximo = np.nanmax(-x / beta, axis=0)
+        return {'loc': -beta * (np.log(soma / n) + maximo), 'scale': beta}
+    if nome == 'weibull':
+        y = np.log(x)
+        media_y = np.nansum(y, axis=0) / n
+
+        def equacao(c):
+            m, v, _ = _media_ponderada(y, c * y, valido)
+            return 1 / c + media_y - m, -1 / c ** 2 - v
+
+        c = _newton(equacao, _lmomentos(nome, x)['c'])
+        maximo = np.nanmax(c * y, axis=0)
+        _, _, soma = _media_ponderada(y, c * y, valido)
+        return {'c': c, 'scale': np.exp((np.log(soma / n) + maximo) / c)}
+    # GEV e Pearson III não têm solução vetorizável simples: o ajuste é feito
+    # estação a estação pelo scipy, partindo das estimativas por momentos-L
+    dist, nomes, _ = DISTRIBUICOES[nome]
+    dist = _scipy(dist)
+    inicial = _lmomentos(nome, x)
+    parametros = dict((p, np.full(x.shape[1], np.nan)) for p in nomes)
+    for j in range(x.shape[1]):
+        amostra = x[valido[:, j], j]
+        if amostra.size < len(nomes):
+            continue
+        estimativa = dist.fit(amostra, inicial[nomes[0]][j],
+                              loc=inicial['loc'][j], scale=inicial['scale'][j])
+        for p, valor in zip(nomes, estimativa):
+            parametros[p][j] = valor
+    return parametros
+
+
+def ajustar(amostras, distribuicao, metodo='lmomentos'):
+    """Ajusta uma distribuição às amostras de todas as estações.
+
+    amostras segue as convenções de amostras.empilhar. distribuicao é uma
+    das chaves de DISTRIBUICOES e metodo um dos METODOS. Retorna um Ajuste.
+    """
+    if distribuicao not in DISTRIBUICOES:
+        raise ValueError('distribuição desconhecida: %s' % distribuicao)
+    if metodo not in METODOS:
+        raise ValueError('método desconhecido: %s' % metodo)
+    valores, estacoes = empilhar(amostras)
+    if DISTRIBUICOES[distribuicao][2]:
+        valores = np.log10(valores)
+    estimar = {'momentos': _momentos, 'lmomentos': _lmomentos, 'mv': _mv}[metodo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        parametros = estimar(distribuicao, valores)
+    parametros = dict((p, np.asarray(v, dtype=np.float64))
+                      for p, v in parametros.items())
+    return Ajuste(distribuicao, parametros, estacoes)
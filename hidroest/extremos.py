@@ -0,0 +1,191 @@
+# coding: utf-8
+"""Vazões médias, máximas e mínimas anuais a partir da série diária.
+
+O ano pode ser o ano civil ou o ano hidrológico, definido pelo mês de início.
+As estatísticas de todos os anos são obtidas em uma única passada pela série,
+usando os limites dos anos (np.*.reduceat) em vez de um groupby para cada
+estatística. Séries de várias estações (uma coluna por estação) são
+processadas juntas.
+
+As vazões mínimas de d dias (Q7, Q30) usam médias móveis calculadas por soma
+acumulada, e o mínimo de cada ano é novamente uma redução pelos limites dos
+anos, de custo linear no tamanho da série.
+
+Cada ano traz o número de dias com dados; com cobertura_minima, os anos
+com menos dessa fração de dias válidos (anos parciais no início e no fim do
+registro ou com muitas falhas) resultam em NaN em vez de entrarem como
+amostras. As análises em lote usam COBERTURA_MINIMA.
+
+As vazões podem ser um DataFrame, uma Series ou uma SerieDiaria.
+"""
+
+from __future__ import division
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from hidroest.frequencia import quantis_normal
+from hidroest.serie import SerieDiaria
+
+# fração mínima de dias com dados de um ano usada pelas análises em lote
+COBERTURA_MINIMA = 0.9
+
+ExtremosAnuais = namedtuple('ExtremosAnuais',
+                            ['media', 'maxima', 'data_maxima',
+                             'minima', 'data_minima', 'dias'])
+
+
+def ano_hidrologico(indice, mes_inicio=1):
+    """Ano (civil ou hidrológico) de cada data do índice.
+
+    O ano hidrológico é identificado pelo ano em que termina, como em
+    index.to_period('A-AUG') para mes_inicio=9.
+    """
+    indice = pd.DatetimeIndex(indice)
+    ano = indice.year.to_numpy()
+    if mes_inicio > 1:
+        ano = ano + (indice.month.to_numpy() >= mes_inicio)
+    return ano
+
+
+def limites_anos(indice, mes_inicio=1):
+    """Anos presentes na série e posição do primeiro dia de cada um.
+
+    O índice deve estar em ordem cronológica.
+    """
+    ano = ano_hidrologico(indice, mes_inicio)
+    inicio = np.flatnonzero(np.r_[True, ano[1:] != ano[:-1]])
+    return ano[inicio], inicio
+
+
+def _dias_ano(anos, mes_inicio=1):
+    # número de dias de cada ano, civil ou hidrológico (identificado pelo ano
+    # em que termina)
+    ano = np.asarray(anos, dtype=np.int64) - (mes_inicio > 1) - 1970
+    inicio = ano.astype('datetime64[Y]') + np.timedelta64(mes_inicio - 1, 'M')
+    fim = inicio + np.timedelta64(12, 'M')
+    return (fim.astype('datetime64[D]') - inicio.astype('datetime64[D]')).astype(np.int64)
+
+
+def _incompletos(contagem, anos, mes_inicio, cobertura_minima):
+    # anos (linhas) de cada estação (colunas) com dias válidos insuficientes
+    minimo = cobertura_minima * _dias_ano(anos, mes_inicio)
+    return contagem < minimo.reshape((-1,) + (1,) * (contagem.ndim - 1))
+
+
+def _preparar(vazoes):
+    # valores (dias x estações) em float64, índice de datas e colunas
+    if isinstance(vazoes, SerieDiaria):
+        valores = vazoes.preenchida()
+        return (valores.ndim == 1, valores.reshape(len(vazoes), -1), vazoes.indice,
+                pd.Index(vazoes.colunas))
+    serie = isinstance(vazoes, pd.Series)
+    quadro = vazoes.to_frame() if serie else vazoes
+    if not quadro.index.is_monotonic_increasing:
+        quadro = quadro.sort_index()
+    return serie, quadro.to_numpy(dtype=np.float64), quadro.index, quadro.columns
+
+
+def _montar(valores, anos, colunas, serie):
+    resultado = pd.DataFrame(valores, index=pd.Index(anos, name='Ano'),
+                             columns=colunas)
+    return resultado.iloc[:, 0] if serie else resultado
+
+
+def _primeira_posicao(igual, inicio):
+    # posição do primeiro True de cada grupo; n se o grupo não tiver nenhum
+    n = igual.shape[0]
+    posicao = np.arange(n).reshape((n,) + (1,) * (igual.ndim - 1))
+    return np.minimum.reduceat(np.where(igual, posicao, n), inicio, axis=0)
+
+
+def extremos_anuais(vazoes, mes_inicio=1, cobertura_minima=0):
+    """Média, máxima, mínima e datas da máxima e da mínima de cada ano.
+
+    vazoes é um DataFrame (uma coluna por estação) ou Series com índice de
+    datas. Os resultados têm as mesmas colunas da entrada e um valor por ano,
+    como os groupby(index.year) das células In[70] e In[76], e dias é o
+    número de dias com dados de cada ano. Falhas (NaN) são ignoradas; anos
+    sem dados, ou com menos de cobertura_minima (fração) dos dias do ano com
+    dados, resultam em NaN/NaT.
+    """
+    serie, valores, indice, colunas = _preparar(vazoes)
+    anos, inicio = limites_anos(indice, mes_inicio)
+    valido = ~np.isnan(valores)
+
+    contagem = np.add.reduceat(valido, inicio, axis=0)
+    soma = np.add.reduceat(np.where(valido, valores, 0), inicio, axis=0)
+    maxima = np.maximum.reduceat(np.where(valido, valores, -np.inf), inicio, axis=0)
+    minima = np.minimum.reduceat(np.where(valido, valores, np.inf), inicio, axis=0)
+    tamanho = np.diff(np.r_[inicio, valores.shape[0]])
+    pos_max = _primeira_posicao(valores == np.repeat(maxima, tamanho, axis=0), inicio)
+    pos_min = _primeira_posicao(valores == np.repeat(minima, tamanho, axis=0), inicio)
+
+    vazio = (contagem == 0) | _incompletos(contagem, anos, mes_inicio, cobertura_minima)
+    with np.errstate(invalid='ignore'):
+        media = soma / contagem
+    media[vazio] = np.nan
+    maxima[vazio] = np.nan
+    minima[vazio] = np.nan
+    pos_max[vazio] = valores.shape[0]
+    pos_min[vazio] = valores.shape[0]
+    datas = np.r_[indice.to_numpy(), np.datetime64('NaT')]
+
+    def montar(valores):
+        return _montar(valores, anos, colunas, serie)
+
+    return ExtremosAnuais(montar(media), montar(maxima), montar(datas[pos_max]),
+                          montar(minima), montar(datas[pos_min]), montar(contagem))
+
+
+def media_movel(valores, d):
+    """Média móvel de d dias ao longo do eixo 0, calculada por soma acumulada.
+
+    O valor de cada dia é a média dos d dias que terminam nele; janelas
+    incompletas ou com falhas (NaN) resultam em NaN.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    valido = ~np.isnan(valores)
+    zeros = np.zeros((1,) + valores.shape[1:])
+    soma = np.concatenate((zeros, np.cumsum(np.where(valido, valores, 0), axis=0)))
+    contagem = np.concatenate((zeros, np.cumsum(valido, axis=0)))
+    media = np.full(valores.shape, np.nan)
+    if valores.shape[0] >= d:
+        completa = (contagem[d:] - contagem[:-d]) == d
+        media[d - 1:] = np.where(completa, (soma[d:] - soma[:-d]) / d, np.nan)
+    return media
+
+
+def minima_movel_anual(vazoes, d=7, mes_inicio=1, cobertura_minima=0):
+    """Vazão mínima anual da média móvel de d dias (Q7 para d=7, Q30 para d=30).
+
+    A janela é atribuída ao ano do seu último dia. Anos com menos de
+    cobertura_minima (fração) dos dias com dados resultam em NaN. O
+    resultado tem o mesmo formato dos campos de extremos_anuais e pode
+    seguir diretamente para a posição de plotagem de Weibull e o cálculo de
+    TR, como na célula In[82].
+    """
+    serie, valores, indice, colunas = _preparar(vazoes)
+    media = media_movel(valores, d)
+    anos, inicio = limites_anos(indice, mes_inicio)
+    minima = np.minimum.reduceat(np.where(np.isnan(media), np.inf, media),
+                                 inicio, axis=0)
+    minima[np.isinf(minima)] = np.nan
+    contagem = np.add.reduceat(~np.isnan(valores), inicio, axis=0)
+    minima[_incompletos(contagem, anos, mes_inicio, cobertura_minima)] = np.nan
+    return _montar(minima, anos, colunas, serie)
+
+
+def vazao_minima_tr(minimas, TR=10, log10=False):
+    """Vazão mínima de TR anos (Q7,10 para as mínimas de 7 dias e TR=10).
+
+    Ajusta a distribuição normal (ou log-normal, com log10=True) às mínimas
+    anuais de cada estação, como na célula In[83].
+    """
+    minimas = pd.DataFrame(minimas)
+    if log10:
+        minimas = np.log10(minimas)
+    Q = quantis_normal([TR], minimas.mean().to_numpy(), minimas.std().to_numpy(),
+                       tipo='minima', log10=log10)
+    return pd.Series(Q[:, 0], index=minimas.columns)
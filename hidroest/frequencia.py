@@ -0,0 +1,57 @@
+# coding: utf-8
+"""Análise de frequência: quantis associados a tempos de retorno.
+
+Todas as funções aceitam vetores de tempos de retorno (TR) e calculam os
+quantis em uma única chamada vetorizada da função inversa da distribuição
+(ppf), em vez de um laço elemento a elemento.
+"""
+
+from __future__ import division
+import numpy as np
+
+
+def probabilidade_tr(TR, tipo='maxima'):
+    """Probabilidade de não excedência correspondente a cada TR.
+
+    Para vazões máximas P = 1 - 1/TR; para vazões mínimas P = 1/TR.
+    """
+    TR = np.asarray(TR, dtype=np.float64)
+    if tipo == 'maxima':
+        return 1 - 1 / TR
+    if tipo == 'minima':
+        return 1 / TR
+    raise ValueError("tipo deve ser 'maxima' ou 'minima'")
+
+
+def quantis(TR, distribuicao, tipo='maxima', log10=False):
+    """Quantis de uma distribuição ajustada para um vetor de TR.
+
+    distribuicao é uma distribuição congelada do scipy.stats, por exemplo
+    ss.norm(loc=media, scale=desvio). Se os parâmetros forem vetores de
+    forma (estacoes, 1), o resultado tem forma (estacoes, len(TR)).
+    Com log10=True a distribuição é a dos logaritmos decimais das vazões e
+    o resultado é devolvido em vazão (10**quantil).
+    """
+    Q = distribuicao.ppf(probabilidade_tr(TR, tipo))
+    if log10:
+        Q = 10 ** Q
+    return Q
+
+
+def quantis_normal(TR, media, desvio, tipo='maxima', log10=False):
+    """Quantis da distribuição normal (ou log-normal, com log10=True).
+
+    media e desvio podem ser escalares ou vetores com um valor por estação;
+    neste caso o resultado tem forma (estacoes, len(TR)).
+    """
+    media = np.asarray(media, dtype=np.float64)
+    desvio = np.asarray(desvio, dtype=np.float64)
+    if media.ndim:
+        media = media[:, np.newaxis]
+        desvio = desvio[:, np.newaxis]
+    from scipy.special import ndtri
+    z = ndtri(probabilidade_tr(TR, tipo))
+    Q = media + desvio * z
+    if log10:
+        Q = 10 ** Q
+    return Q
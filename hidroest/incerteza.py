@@ -0,0 +1,100 @@
+# coding: utf-8
+"""Intervalos de confiança dos quantis de projeto por bootstrap.
+
+As B reamostragens são geradas de uma vez como uma matriz de índices (B, n)
+e reajustadas em uma única chamada de distribuicoes.ajustar, tratando cada
+reamostragem como se fosse uma estação. No bootstrap paramétrico as amostras
+são sorteadas da distribuição ajustada. Opcionalmente as reamostragens são
+divididas entre processos, que gravam os quantis em memória compartilhada.
+"""
+
+from __future__ import division
+import numpy as np
+import pandas as pd
+
+from hidroest.distribuicoes import DISTRIBUICOES, ajustar
+
+
+def _reamostrar(x, ajuste, B, parametrico, rng):
+    n = x.size
+    if parametrico:
+        amostras = ajuste.congelar().rvs(size=(n, B), random_state=rng)
+        return 10 ** amostras if ajuste.log10 else amostras
+    # coluna b da matriz é a reamostragem b (forma n x B, como estações)
+    return x[rng.integers(0, n, size=(n, B))]
+
+
+def _quantis_bootstrap(x, TR, distribuicao, metodo, tipo, B, parametrico, rng):
+    ajuste = ajustar(x, distribuicao, metodo)
+    amostras = _reamostrar(x, ajuste, B, parametrico, rng)
+    return ajustar(amostras, distribuicao, metodo).quantis(TR, tipo)
+
+
+def _trabalho(args):
+    # executado em um processo do pool: grava as linhas [inicio, fim) do
+    # arranjo compartilhado de quantis
+    from multiprocessing import shared_memory
+    nome, forma, inicio, fim, semente, x, TR, distribuicao, metodo, tipo, parametrico = args
+    memoria = shared_memory.SharedMemory(name=nome)
+    try:
+        saida = np.ndarray(forma, dtype=np.float64, buffer=memoria.buf)
+        rng = np.random.default_rng(semente)
+        saida[inicio:fim] = _quantis_bootstrap(x, TR, distribuicao, metodo, tipo,
+                                               fim - inicio, parametrico, rng)
+    finally:
+        memoria.close()
+
+
+def _paralelo(x, TR, distribuicao, metodo, tipo, B, parametrico, semente, processos):
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+    forma = (B, len(TR))
+    memoria = shared_memory.SharedMemory(create=True, size=8 * B * len(TR))
+    try:
+        limites = np.linspace(0, B, processos + 1).astype(int)
+        sementes = np.random.SeedSequence(semente).spawn(processos)
+        tarefas = [(memoria.name, forma, limites[i], limites[i + 1], sementes[i],
+                    x, TR, distribuicao, metodo, tipo, parametrico)
+                   for i in range(processos)]
+        with ProcessPoolExecutor(processos) as pool:
+            list(pool.map(_trabalho, tarefas))
+        return np.ndarray(forma, dtype=np.float64, buffer=memoria.buf).copy()
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+
+def intervalo_quantis(amostra, TR, distribuicao='lognormal', metodo='momentos',
+                      tipo='maxima', B=10000, nivel=0.90, parametrico=False,
+                      semente=None, processos=1):
+    """Quantis de projeto com intervalo de confiança por bootstrap.
+
+    amostra é a série anual de uma estação (NaN são descartados) e TR a grade
+    de tempos de retorno. Retorna um DataFrame indexado por TR com o quantil
+    estimado (Q) e os limites inferior e superior do intervalo de confiança
+    (percentis da distribuição bootstrap). Com processos > 1 as B
+    reamostragens são divididas entre processos com sementes independentes
+    (SeedSequence.spawn).
+
+    Os métodos vetorizados (momentos, momentos-L e máxima verossimilhança
+    das distribuições normal, log-normal, Gumbel, exponencial e Weibull)
+    reajustam as B reamostragens em uma única chamada; a máxima
+    verossimilhança da GEV e da Pearson III é feita reamostragem a
+    reamostragem e é muito mais lenta.
+    """
+    if distribuicao not in DISTRIBUICOES:
+        raise ValueError('distribuição desconhecida: %s' % distribuicao)
+    x = np.asarray(amostra, dtype=np.float64)
+    x = x[~np.isnan(x)]
+    TR = np.asarray(TR, dtype=np.float64)
+    if processos > 1:
+        Q = _paralelo(x, TR, distribuicao, metodo, tipo, B, parametrico,
+                      semente, processos)
+    else:
+        rng = np.random.default_rng(semente)
+        Q = _quantis_bootstrap(x, TR, distribuicao, metodo, tipo, B, parametrico, rng)
+    alfa = (1 - nivel) / 2
+    inferior, superior = np.nanquantile(Q, [alfa, 1 - alfa], axis=0)
+    estimado = ajustar(x, distribuicao, metodo).quantis(TR, tipo)[0]
+    return pd.DataFrame({'Q': estimado, 'inferior': inferior, 'superior': superior},
+                        index=pd.Index(TR, name='TR'))
@@ -0,0 +1,117 @@
+# coding: utf-8
+"""Leitura das planilhas de dados com cache colunar em disco.
+
+Na primeira leitura cada planilha .xlsx é convertida em um diretório de cache
+com um arquivo .npy por coluna. As leituras seguintes carregam as colunas
+diretamente desses arquivos (mapeados em memória), sem passar pelo openpyxl.
+O cache é identificado pela data de modificação e pelo tamanho da planilha
+(ou pelo seu hash, se solicitado), de forma que qualquer alteração na planilha
+gera uma nova conversão.
+"""
+
+from __future__ import division
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+DIR_CACHE = '.hidroest_cache'
+VERSAO_CACHE = 1
+
+
+def chave_arquivo(arquivo, usar_hash=False):
+    """Retorna a chave de cache da planilha: mtime e tamanho, ou hash SHA-1."""
+    if usar_hash:
+        sha = hashlib.sha1()
+        with open(arquivo, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b''):
+                sha.update(bloco)
+        return sha.hexdigest()
+    st = os.stat(arquivo)
+    mtime = getattr(st, 'st_mtime_ns', int(st.st_mtime * 1e9))
+    return '%d-%d' % (mtime, st.st_size)
+
+
+def caminho_cache(arquivo, sheet_name=0, dir_cache=None, usar_hash=False):
+    """Diretório do cache correspondente à planilha e à aba informadas."""
+    if dir_cache is None:
+        dir_cache = os.path.join(os.path.dirname(os.path.abspath(arquivo)), DIR_CACHE)
+    nome = '%s.%s.%s' % (os.path.basename(arquivo), sheet_name,
+                         chave_arquivo(arquivo, usar_hash))
+    return os.path.join(dir_cache, nome)
+
+
+def _converter(arquivo, sheet_name, destino):
+    quadro = pd.read_excel(arquivo, sheet_name=sheet_name)
+    base = os.path.dirname(destino)
+    if not os.path.isdir(base):
+        os.makedirs(base)
+    temp = tempfile.mkdtemp(dir=base)
+    colunas = []
+    for i, nome in enumerate(quadro.columns):
+        valores = quadro[nome].to_numpy()
+        objeto = valores.dtype == object
+        np.save(os.path.join(temp, 'c%d.npy' % i), valores, allow_pickle=objeto)
+        if not isinstance(nome, (int, float)):
+            nome = str(nome)
+        colunas.append({'nome': nome, 'objeto': bool(objeto)})
+    with open(os.path.join(temp, 'meta.json'), 'w') as f:
+        json.dump({'versao': VERSAO_CACHE, 'colunas': colunas}, f)
+    try:
+        os.rename(temp, destino)
+    except OSError:
+        # outro processo converteu a mesma planilha ao mesmo tempo
+        shutil.rmtree(temp, ignore_errors=True)
+    # remove caches de versões anteriores da mesma planilha
+    prefixo = os.path.basename(destino).rsplit('.', 1)[0] + '.'
+    for antigo in os.listdir(base):
+        if antigo.startswith(prefixo) and os.path.join(base, antigo) != destino:
+            shutil.rmtree(os.path.join(base, antigo), ignore_errors=True)
+
+
+def _carregar(destino, memmap=True):
+    with open(os.path.join(destino, 'meta.json')) as f:
+        meta = json.load(f)
+    dados = {}
+    for i, coluna in enumerate(meta['colunas']):
+        arquivo = os.path.join(destino, 'c%d.npy' % i)
+        if coluna['objeto']:
+            dados[coluna['nome']] = np.load(arquivo, allow_pickle=True)
+        else:
+            # mapeamento copy-on-write: np.asarray mantém a visão, sem cópia, e
+            # as alterações no quadro ficam na memória, sem chegar ao cache
+            valores = np.asarray(np.load(arquivo, mmap_mode='c' if memmap else None))
+            if not valores.flags.writeable:
+                valores = valores.copy()
+            dados[coluna['nome']] = valores
+    return pd.DataFrame(dados, copy=False)
+
+
+def ler_excel(arquivo, index_col=None, sheet_name=0, dir_cache=None,
+              usar_hash=False, memmap=True):
+    """Lê uma planilha como pd.read_excel, usando o cache colunar em disco.
+
+    index_col tem o mesmo significado de pd.read_excel: nome da coluna
+    ('data', 'Data', 'ANO', 'Ano', 'Medicao', 'Amostra'...), posição ou lista.
+    Com memmap=True as colunas numéricas são mapeadas em memória, sem cópia;
+    o quadro pode ser alterado normalmente, sem modificar o cache.
+    """
+    destino = caminho_cache(arquivo, sheet_name, dir_cache, usar_hash)
+    if not os.path.isdir(destino):
+        _converter(arquivo, sheet_name, destino)
+    quadro = _carregar(destino, memmap)
+    if index_col is not None:
+        if not isinstance(index_col, list):
+            index_col = [index_col]
+        nomes = [quadro.columns[c] if isinstance(c, int) else c for c in index_col]
+        quadro = quadro.set_index(nomes if len(nomes) > 1 else nomes[0])
+    return quadro
+
+
+def limpar_cache(dir_cache):
+    """Remove todo o diretório de cache."""
+    shutil.rmtree(dir_cache, ignore_errors=True)
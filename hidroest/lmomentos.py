@@ -0,0 +1,117 @@
+# coding: utf-8
+"""Momentos-L amostrais (Hosking, 1990).
+
+Os momentos-L são obtidos dos momentos ponderados por probabilidade (b0..b3)
+da amostra ordenada. Todas as estações são ordenadas de uma vez e os pesos
+dependem apenas da posição de cada valor e do tamanho de cada amostra.
+As amostras podem estar empilhadas em um arranjo 2-D completado com NaN
+(lmomentos) ou concatenadas em um vetor com as posições de início de cada
+estação (lmomentos_agrupados).
+"""
+
+from __future__ import division
+import numpy as np
+import pandas as pd
+
+from hidroest.amostras import empilhar, ordenar
+
+COLUNAS = ['l1', 'l2', 'l3', 'l4', 't3', 't4']
+
+
+def _pesos(j, n):
+    # peso_r = C(j, r) / C(n - 1, r) / n, com j a posição (a partir de 0) do
+    # valor na amostra ordenada em ordem crescente
+    peso = np.ones(np.broadcast(j, n).shape) / n
+    pesos = [peso]
+    for r in range(1, 4):
+        peso = peso * (j - r + 1) / (n - r)
+        pesos.append(peso)
+    return pesos
+
+
+def mpp(ordenados, n):
+    """Momentos ponderados por probabilidade b0..b3 das colunas ordenadas.
+
+    ordenados tem cada coluna em ordem crescente com os NaN ao final e n é o
+    número de valores válidos de cada coluna. Retorna um arranjo (4, colunas).
+    """
+    j = np.arange(ordenados.shape[0], dtype=np.float64)[:, np.newaxis]
+    n = np.asarray(n, dtype=np.float64)
+    x = np.where(j < n, ordenados, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.array([np.sum(peso * x, axis=0) for peso in _pesos(j, n)])
+
+
+def mpp_agrupados(valores, grupo, n):
+    """Momentos ponderados por probabilidade de amostras concatenadas.
+
+    valores está ordenado por grupo e, dentro de cada grupo, em ordem
+    crescente; grupo é o índice da amostra de cada valor e n o tamanho de
+    cada amostra. Retorna um arranjo (4, grupos).
+    """
+    n = np.asarray(n, dtype=np.float64)
+    inicio = np.concatenate(([0], np.cumsum(n)[:-1]))
+    j = np.arange(valores.size) - inicio[grupo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.array([np.bincount(grupo, peso * valores, minlength=n.size)
+                         for peso in _pesos(j, n[grupo])])
+
+
+def razoes(b, n=None):
+    """Momentos-L l1..l4 e razões t3, t4 a partir de b0..b3.
+
+    Com os tamanhos n das amostras, amostras vazias ficam com todos os
+    momentos NaN e as com menos de 4 valores com l3, l4, t3 e t4 NaN.
+    """
+    l1 = b[0]
+    l2 = 2 * b[1] - b[0]
+    l3 = 6 * b[2] - 6 * b[1] + b[0]
+    l4 = 20 * b[3] - 30 * b[2] + 12 * b[1] - b[0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        momentos = np.array([l1, l2, l3, l4, l3 / l2, l4 / l2], dtype=np.float64)
+    if n is not None:
+        n = np.asarray(n)
+        momentos[:, n == 0] = np.nan
+        momentos[2:, n < 4] = np.nan
+    return momentos
+
+
+def lmomentos(amostras):
+    """Momentos-L amostrais de cada estação.
+
+    amostras segue as convenções de amostras.empilhar (DataFrame com uma
+    coluna por estação, vetor, lista de séries de tamanhos diferentes...).
+    Retorna um DataFrame com as colunas l1, l2, l3, l4, t3 e t4.
+    """
+    valores, estacoes = empilhar(amostras)
+    ordenados, n = ordenar(valores)
+    return pd.DataFrame(razoes(mpp(ordenados, n), n).T, index=estacoes,
+                        columns=COLUNAS)
+
+
+def lmomentos_agrupados(valores, offsets, estacoes=None):
+    """Momentos-L de várias amostras concatenadas em um único vetor.
+
+    A amostra da estação i é valores[offsets[i]:offsets[i + 1]], de modo que
+    offsets tem uma posição a mais que o número de estações. As amostras são
+    ordenadas todas juntas (por valor e, de forma estável, por estação) e os momentos
+    ponderados são acumulados com np.bincount, sem laço por estação. Falhas
+    (NaN) são descartadas.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    k = offsets.size - 1
+    if offsets[0] != 0 or offsets[-1] != valores.size or (np.diff(offsets) < 0).any():
+        raise ValueError('offsets deve crescer de 0 até o tamanho de valores')
+    grupo = np.repeat(np.arange(k), np.diff(offsets))
+    valido = ~np.isnan(valores)
+    valores, grupo = valores[valido], grupo[valido]
+    # ordena pelos valores e depois, de forma estável, pela estação
+    ordem = np.argsort(valores, kind='stable')
+    ordem = ordem[np.argsort(grupo[ordem], kind='stable')]
+    valores, grupo = valores[ordem], grupo[ordem]
+    n = np.bincount(grupo, minlength=k)
+    if estacoes is None:
+        estacoes = pd.RangeIndex(k)
+    return pd.DataFrame(razoes(mpp_agrupados(valores, grupo, n), n).T,
+                        index=estacoes, columns=COLUNAS)
@@ -0,0 +1,193 @@
+# coding: utf-8
+"""Execução das análises por estação para uma rede inteira, em paralelo.
+
+Uma sequência de análises (curva de permanência, máximas anuais, ajuste
+log-normal, Q7,10...) é aplicada a cada estação e os resultados, alguns
+números por estação, são reunidos em uma única tabela. As estações são
+divididas em lotes de colunas enviados a um ProcessPoolExecutor, com um
+número limitado de lotes em andamento. Os dados não são enviados aos
+processos: um acervo (AcervoVazoes) é reaberto por cada processo, mapeado
+em memória, e as demais entradas são copiadas uma única vez para memória
+compartilhada. Uma falha em uma estação fica registrada na coluna erro e não
+interrompe as demais.
+"""
+
+from __future__ import division
+import os
+
+import numpy as np
+import pandas as pd
+
+from hidroest.acervo import AcervoVazoes
+from hidroest.distribuicoes import ajustar
+from hidroest.extremos import (COBERTURA_MINIMA, extremos_anuais, minima_movel_anual,
+                               vazao_minima_tr)
+from hidroest.permanencia import vazao_permanencia
+from hidroest.serie import SerieDiaria
+
+TAMANHO_LOTE = 64
+TR_PROJETO = (10, 50, 100)
+
+
+def permanencia(serie, **opcoes):
+    """Q50, Q90 e Q95."""
+    Q = vazao_permanencia(serie, [50, 90, 95])
+    return {'Q50': Q[0], 'Q90': Q[1], 'Q95': Q[2]}
+
+
+def _maximas(serie, mes_inicio=1, cobertura_minima=COBERTURA_MINIMA, **opcoes):
+    # anos com menos de cobertura_minima dos dias com dados são descartados
+    return extremos_anuais(serie, mes_inicio, cobertura_minima).maxima.dropna()
+
+
+def maximas(serie, **opcoes):
+    """Número de anos, média e desvio padrão das vazões máximas anuais."""
+    maxima = _maximas(serie, **opcoes)
+    return {'anos': maxima.size, 'media_max': maxima.mean(), 'desvio_max': maxima.std()}
+
+
+def lognormal(serie, TR=TR_PROJETO, **opcoes):
+    """Vazões máximas de projeto da distribuição log-normal (momentos)."""
+    Q = ajustar(_maximas(serie, **opcoes), 'lognormal', 'momentos').quantis(TR)[0]
+    return dict(('Qmax_TR%g' % tr, q) for tr, q in zip(TR, Q))
+
+
+def q7_10(serie, mes_inicio=1, cobertura_minima=COBERTURA_MINIMA, **opcoes):
+    """Vazão mínima de 7 dias e 10 anos de tempo de retorno."""
+    minimas = minima_movel_anual(serie, 7, mes_inicio, cobertura_minima).dropna()
+    return {'Q7_10': vazao_minima_tr(minimas, TR=10).iloc[0]}
+
+
+ANALISES = {'permanencia': permanencia, 'maximas': maximas,
+            'lognormal': lognormal, 'q7_10': q7_10}
+
+
+def _analisar(serie, analises, opcoes):
+    # resultados de uma estação; a exceção é registrada em vez de propagada
+    linha = {}
+    try:
+        for analise in analises:
+            linha.update(analise(serie, **opcoes))
+        linha['erro'] = None
+    except Exception as e:
+        linha['erro'] = '%s: %s' % (type(e).__name__, e)
+    return linha
+
+
+def _abrir(fonte):
+    if fonte[0] == 'acervo':
+        return AcervoVazoes(fonte[1]).vazoes, None
+    from multiprocessing import shared_memory
+    _, nome, forma, dtype = fonte
+    memoria = shared_memory.SharedMemory(name=nome)
+    return np.ndarray(forma, dtype=dtype, buffer=memoria.buf), memoria
+
+
+def _lote(args):
+    # executado em um processo do pool para as colunas j do lote
+    fonte, inicio, freq, a, b, codigos, colunas, analises, opcoes = args
+    dados, memoria = _abrir(fonte)
+    try:
+        return [_analisar(SerieDiaria(inicio, dados[a:b, j], [codigo], freq),
+                          analises, opcoes)
+                for codigo, j in zip(codigos, colunas)]
+    finally:
+        del dados
+        if memoria is not None:
+            memoria.close()
+
+
+def _funcoes(analises):
+    if callable(analises) or isinstance(analises, str):
+        analises = [analises]
+    return [ANALISES[a] if isinstance(a, str) else a for a in analises]
+
+
+def analisar_rede(vazoes, analises=('permanencia', 'maximas'), estacoes=None,
+                  inicio=None, fim=None, processos=None, tamanho_lote=TAMANHO_LOTE,
+                  **opcoes):
+    """Aplica as análises a cada estação e reúne os resultados em uma tabela.
+
+    vazoes é um AcervoVazoes, uma SerieDiaria ou um DataFrame (dias x
+    estações). analises são nomes de ANALISES ou funções f(serie, **opcoes)
+    que retornam um dicionário de resultados; com processos > 1 as funções
+    devem ser definidas no nível de um módulo. opcoes (mes_inicio, TR,
+    cobertura_minima...) são repassadas a todas as análises. Retorna um
+    DataFrame indexado pela estação, com uma coluna por resultado e a coluna
+    erro (None se a estação foi processada sem falhas).
+    """
+    analises = _funcoes(analises)
+    if processos is None:
+        processos = os.cpu_count() or 1
+    acervo = vazoes if isinstance(vazoes, AcervoVazoes) else None
+    if acervo is not None:
+        todas = acervo.serie(inicio=inicio, fim=fim)
+    else:
+        if not isinstance(vazoes, SerieDiaria):
+            vazoes = SerieDiaria.de_quadro(vazoes, dtype=np.float64)
+        todas = vazoes.fatia(inicio, fim)
+    if estacoes is None:
+        estacoes = todas.colunas
+    colunas = pd.Index(todas.colunas)
+    posicao = colunas.get_indexer(estacoes)
+    if (posicao < 0).any():
+        raise KeyError('estações sem dados: %s' % list(pd.Index(estacoes)[posicao < 0]))
+    if processos <= 1:
+        linhas = [_analisar(todas.coluna(e), analises, opcoes) for e in estacoes]
+    else:
+        linhas = _paralelo(todas, acervo, list(estacoes), posicao, analises, opcoes,
+                           processos, tamanho_lote)
+    return pd.DataFrame(linhas, index=pd.Index(estacoes, name='estacao'))
+
+
+def _paralelo(todas, acervo, estacoes, posicao, analises, opcoes, processos,
+              tamanho_lote):
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    memoria = None
+    if acervo is not None:
+        # o acervo é reaberto por cada processo; só se recortam os dias
+        fonte = ('acervo', acervo.diretorio)
+        a = acervo.serie().posicao(todas.inicio)
+        b = a + len(todas)
+    else:
+        from multiprocessing import shared_memory
+        # estações pedidas copiadas, na ordem, para a memória compartilhada
+        origem = todas.valores.reshape(len(todas), -1)[:, posicao]
+        memoria = shared_memory.SharedMemory(create=True, size=max(origem.nbytes, 1))
+        dados = np.ndarray(origem.shape, dtype=origem.dtype, buffer=memoria.buf)
+        dados[:] = origem
+        del origem
+        fonte = ('memoria', memoria.name, dados.shape, dados.dtype.str)
+        a, b = 0, len(todas)
+        posicao = np.arange(len(estacoes))
+    linhas = [None] * len(estacoes)
+    try:
+        with ProcessPoolExecutor(processos) as pool:
+            pendentes = {}
+            for i in range(0, len(estacoes), tamanho_lote):
+                lote = (i, estacoes[i:i + tamanho_lote])
+                tarefa = (fonte, todas.inicio, todas.freq, a, b, lote[1],
+                          posicao[i:i + tamanho_lote].tolist(), analises, opcoes)
+                pendentes[pool.submit(_lote, tarefa)] = lote
+                # no máximo dois lotes por processo em andamento
+                if len(pendentes) >= 2 * processos:
+                    _coletar(pendentes, linhas, wait(pendentes,
+                                                     return_when=FIRST_COMPLETED)[0])
+            _coletar(pendentes, linhas, list(pendentes))
+    finally:
+        if memoria is not None:
+            del dados
+            memoria.close()
+            memoria.unlink()
+    return linhas
+
+
+def _coletar(pendentes, linhas, prontas):
+    for futuro in prontas:
+        i, codigos = pendentes.pop(futuro)
+        try:
+            resultado = futuro.result()
+        except Exception as e:
+            # o processo do lote falhou: todas as suas estações ficam com o erro
+            resultado = [{'erro': '%s: %s' % (type(e).__name__, e)}] * len(codigos)
+        linhas[i:i + len(codigos)] = resultado
@@ -0,0 +1,137 @@
+# coding: utf-8
+"""Avaliação de pedidos de outorga com base nas vazões de referência.
+
+Como no exemplo da seção 5, a vazão outorgável a cada solicitante é uma
+fração (20%) da vazão de referência (Q90) da estação. O ServicoOutorga
+calcula e guarda as vazões de referência (Q90, Q95 e Q7,10) de cada estação
+e as recalcula apenas quando a planilha de vazões diárias muda (mesma chave
+usada pelo cache de leitura). Os pedidos são avaliados em lote, e o total
+outorgado em cada estação é acumulado para o limite global opcional.
+"""
+
+from __future__ import division
+import numpy as np
+import pandas as pd
+
+from hidroest.extremos import COBERTURA_MINIMA, minima_movel_anual, vazao_minima_tr
+from hidroest.leitura import chave_arquivo, ler_excel
+from hidroest.permanencia import vazao_permanencia
+
+REFERENCIAS = ['Q90', 'Q95', 'Q7_10']
+
+
+def vazoes_referencia(vazoes, mes_inicio=1, cobertura_minima=COBERTURA_MINIMA):
+    """Q90, Q95 e Q7,10 de uma série de vazões diárias.
+
+    Os anos com menos de cobertura_minima dos dias com dados não entram no
+    Q7,10.
+    """
+    Q90, Q95 = vazao_permanencia(vazoes, [90, 95])
+    minimas = minima_movel_anual(vazoes, d=7, mes_inicio=mes_inicio,
+                                 cobertura_minima=cobertura_minima).dropna()
+    return pd.Series([Q90, Q95, vazao_minima_tr(minimas, TR=10).iloc[0]],
+                     index=REFERENCIAS)
+
+
+class ServicoOutorga(object):
+    """Vazões de referência e saldo outorgável de uma rede de estações.
+
+    arquivos relaciona o código de cada estação à sua planilha de vazões
+    diárias (lida com ler_excel, index_col e coluna indicam o índice de datas
+    e a coluna de vazões). referencia é a vazão usada nos limites,
+    fracao_individual a parcela dela outorgável a cada pedido e fracao_total,
+    se informada, a parcela máxima somando todos os pedidos da estação.
+    mes_inicio e cobertura_minima são os de vazoes_referencia.
+    """
+
+    def __init__(self, arquivos, index_col=0, coluna='VazaoD', referencia='Q90',
+                 fracao_individual=0.2, fracao_total=None, mes_inicio=1,
+                 cobertura_minima=COBERTURA_MINIMA):
+        self.arquivos = dict(arquivos)
+        self.index_col = index_col
+        self.coluna = coluna
+        self.referencia = referencia
+        self.fracao_individual = fracao_individual
+        self.fracao_total = fracao_total
+        self.mes_inicio = mes_inicio
+        self.cobertura_minima = cobertura_minima
+        self.estacoes = pd.Index(list(self.arquivos.keys()))
+        self.alocado = pd.Series(0.0, index=self.estacoes)
+        self._cache = {}
+
+    def _referencias_estacao(self, estacao):
+        arquivo = self.arquivos[estacao]
+        chave = chave_arquivo(arquivo)
+        guardado = self._cache.get(estacao)
+        if guardado is None or guardado[0] != chave:
+            vazoes = ler_excel(arquivo, index_col=self.index_col)[self.coluna]
+            guardado = (chave, vazoes_referencia(vazoes, self.mes_inicio,
+                                                 self.cobertura_minima))
+            self._cache[estacao] = guardado
+        return guardado[1]
+
+    def referencias(self, estacoes=None):
+        """Tabela de vazões de referência (estações x Q90, Q95, Q7_10)."""
+        if estacoes is None:
+            estacoes = self.estacoes
+        return pd.DataFrame([self._referencias_estacao(e) for e in estacoes],
+                            index=pd.Index(estacoes))
+
+    def avaliar(self, estacoes, demandas, registrar=True):
+        """Avalia um lote de pedidos (estação, demanda em m3/s).
+
+        Os limites são obtidos com uma única busca vetorizada na tabela de
+        referências. Com fracao_total os pedidos de cada estação são
+        atendidos em ordem de chegada enquanto houver saldo; com
+        registrar=True as demandas aprovadas são somadas ao total outorgado.
+        Retorna um DataFrame com o limite individual, o saldo da estação
+        antes do pedido e a decisão.
+        """
+        demandas = np.asarray(demandas, dtype=np.float64)
+        unicas = pd.unique(np.asarray(estacoes))
+        posicao = self.estacoes.get_indexer(estacoes)
+        if (posicao < 0).any():
+            raise KeyError('estações sem série de vazões: %s'
+                           % list(pd.Index(estacoes)[posicao < 0].unique()))
+        # só as estações presentes no lote são consultadas (NaN nas demais)
+        tabela = self.referencias(unicas)[self.referencia].reindex(
+            self.estacoes).to_numpy()
+        referencia = tabela[posicao]
+        limite = self.fracao_individual * referencia
+        aprovado = demandas <= limite
+        if self.fracao_total is None:
+            saldo_total = np.full(len(self.estacoes), np.inf)
+        else:
+            saldo_total = self.fracao_total * tabela - self.alocado.to_numpy()
+        saldo = saldo_total.copy()
+        saldo_anterior = saldo_total[posicao]
+        if self.fracao_total is not None:
+            # o saldo é consumido em ordem de chegada, apenas pelos aprovados
+            for i in np.flatnonzero(aprovado):
+                saldo_anterior[i] = saldo[posicao[i]]
+                if demandas[i] <= saldo[posicao[i]]:
+                    saldo[posicao[i]] -= demandas[i]
+                else:
+                    aprovado[i] = False
+        if registrar:
+            self.alocado += np.bincount(posicao, np.where(aprovado, demandas, 0),
+                                        minlength=len(self.estacoes))
+        return pd.DataFrame({'estacao': estacoes, 'demanda': demandas,
+                             'limite': limite, 'saldo': saldo_anterior,
+                             'aprovado': aprovado})
+
+    def liberar(self, estacao, demanda):
+        """Devolve ao saldo da estação uma outorga encerrada.
+
+        Levanta ValueError se demanda excede o total outorgado na estação.
+        """
+        if estacao not in self.alocado.index:
+            raise KeyError('estação sem série de vazões: %s' % (estacao,))
+        alocado = self.alocado[estacao]
+        # tolerância para o arredondamento das somas de demandas
+        tolerancia = 1e-9 * alocado + 1e-12
+        if demanda < 0 or demanda > alocado + tolerancia:
+            raise ValueError('liberação de %g m3/s na estação %s, que tem %g m3/s '
+                             'outorgados' % (demanda, estacao, alocado))
+        restante = alocado - demanda
+        self.alocado[estacao] = restante if restante > tolerancia else 0.0
@@ -0,0 +1,164 @@
+# coding: utf-8
+"""Curva de permanência de vazões.
+
+A curva de permanência relaciona a vazão com a porcentagem do tempo em que
+ela é igualada ou superada. Os pontos de interesse (Q50, Q90, Q95 ou qualquer
+grade de porcentagens) são obtidos por seleção parcial (np.partition), sem
+ordenar a série inteira. Para séries lidas em blocos há um histograma
+acumulável (HistogramaPermanencia) que pode ser combinado entre blocos.
+"""
+
+from __future__ import division
+import numpy as np
+import pandas as pd
+
+
+def _valores(vazoes):
+    if isinstance(vazoes, pd.DataFrame):
+        vazoes = vazoes.iloc[:, 0]
+    valores = np.asarray(vazoes, dtype=np.float64)
+    return valores[~np.isnan(valores)]
+
+
+def _posicoes(n, percent):
+    # a i-ésima maior vazão tem permanência i/n*100; a vazão Qp é a primeira
+    # com permanência >= p, que na ordem crescente ocupa a posição n - i
+    i = np.ceil(np.asarray(percent, dtype=np.float64) / 100 * n).astype(np.int64)
+    return n - np.clip(i, 1, n)
+
+
+def curva_permanencia(vazoes, coluna='VazaoD'):
+    """Curva de permanência completa, como na célula In[38] do notebook.
+
+    Retorna um DataFrame com as vazões em ordem decrescente e as colunas
+    NrSup (número de vazões iguais ou superiores) e Percent.
+    """
+    if isinstance(vazoes, pd.DataFrame):
+        vazoes = vazoes[coluna]
+    vazoes = vazoes.dropna()
+    valores = vazoes.to_numpy(dtype=np.float64)
+    ordem = np.argsort(-valores, kind='stable')
+    NrObs = valores.size
+    NrSup = np.arange(1, NrObs + 1)
+    return pd.DataFrame({coluna: valores[ordem],
+                         'NrSup': NrSup,
+                         'Percent': NrSup / NrObs * 100},
+                        index=vazoes.index[ordem])
+
+
+def vazao_permanencia(vazoes, percent=(50, 90, 95)):
+    """Vazões de permanência (Q50, Q90, Q95...) por seleção parcial.
+
+    percent pode ser um escalar ou uma grade de porcentagens; o resultado
+    coincide com a coluna de vazões de curva_permanencia nos mesmos pontos.
+    """
+    valores = _valores(vazoes)
+    escalar = np.ndim(percent) == 0
+    k = _posicoes(valores.size, np.atleast_1d(percent))
+    Q = np.partition(valores, np.unique(k))[k]
+    return Q[0] if escalar else Q
+
+
+class HistogramaPermanencia(object):
+    """Histograma acumulável para estimar a curva de permanência em blocos.
+
+    As classes são logarítmicas entre vmin e vmax, o que mantém o erro
+    relativo da estimativa aproximadamente constante ao longo da curva.
+    Vazões nulas (ou negativas) são contadas em uma classe à parte, e as
+    permanências que caem nela têm vazão 0. Histogramas com as mesmas
+    classes podem ser somados com combinar(), o que permite processar
+    blocos em paralelo.
+    """
+
+    def __init__(self, vmin=1e-3, vmax=1e6, classes=4096):
+        self.limites = np.geomspace(vmin, vmax, classes + 1)
+        self.contagem = np.zeros(classes + 3, dtype=np.int64)
+
+    @property
+    def n(self):
+        return int(self.contagem.sum())
+
+    def adicionar(self, vazoes):
+        valores = _valores(vazoes)
+        # classe 0: vazões <= 0; classe 1: entre 0 e vmin; última: acima de vmax
+        classe = np.searchsorted(self.limites, valores, side='right') + 1
+        classe[valores <= 0] = 0
+        self.contagem += np.bincount(classe, minlength=self.contagem.size)
+        return self
+
+    def combinar(self, outro):
+        if not np.array_equal(self.limites, outro.limites):
+            raise ValueError('os histogramas devem ter as mesmas classes')
+        self.contagem += outro.contagem
+        return self
+
+    def vazao(self, percent=(50, 90, 95)):
+        """Vazões de permanência estimadas por interpolação geométrica.
+
+        Permanências além da porcentagem de vazões positivas têm vazão 0;
+        vazões positivas abaixo de vmin são estimadas como vmin.
+        """
+        escalar = np.ndim(percent) == 0
+        percent = np.atleast_1d(np.asarray(percent, dtype=np.float64))
+        # porcentagem de vazões superiores ao limite inferior de cada classe
+        superiores = self.n - np.concatenate(([0], np.cumsum(self.contagem)))
+        perc_lim = superiores[2:-1] / self.n * 100
+        log_lim = np.log(self.limites)
+        Q = np.exp(np.interp(-percent, -perc_lim, log_lim))
+        Q = np.where(percent > superiores[1] / self.n * 100, 0.0, Q)
+        return Q[0] if escalar else Q
+
+
+class CurvasPermanencia(object):
+    """Curvas de permanência de várias estações, em um único arranjo 2-D.
+
+    vazoes tem forma (dias, estacoes) com cada coluna em ordem decrescente e
+    as falhas (NaN) ao final; n é o número de vazões válidas de cada estação.
+    """
+
+    def __init__(self, estacoes, vazoes, n):
+        self.estacoes = estacoes
+        self.vazoes = vazoes
+        self.n = n
+
+    def percent(self):
+        """Permanência (%) de cada posição de vazoes; NaN nas falhas."""
+        NrSup = np.arange(1, self.vazoes.shape[0] + 1)[:, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = NrSup / self.n * 100
+        percent[NrSup > self.n] = np.nan
+        return percent
+
+    def vazao(self, percent=(90, 95)):
+        """Vazões de permanência de todas as estações (percent x estacoes)."""
+        percent = np.atleast_1d(np.asarray(percent, dtype=np.float64))
+        i = np.ceil(percent[:, np.newaxis] / 100 * self.n).astype(np.int64)
+        i = np.clip(i, 1, np.maximum(self.n, 1)) - 1
+        Q = np.take_along_axis(self.vazoes, i, axis=0)
+        Q[:, self.n == 0] = np.nan
+        return pd.DataFrame(Q, index=percent, columns=self.estacoes)
+
+    def curva(self, estacao, coluna='VazaoD'):
+        """Curva de uma estação no mesmo formato de curva_permanencia."""
+        j = self.estacoes.get_loc(estacao)
+        n = self.n[j]
+        NrSup = np.arange(1, n + 1)
+        return pd.DataFrame({coluna: self.vazoes[:n, j],
+                             'NrSup': NrSup,
+                             'Percent': NrSup / n * 100})
+
+
+def curvas_permanencia(quadro):
+    """Curvas de permanência de todas as colunas (estações) de um DataFrame.
+
+    Todas as estações são ordenadas em uma única chamada de np.sort ao longo
+    do eixo 0; falhas (NaN) são tratadas separadamente em cada coluna.
+    """
+    valores = np.asarray(quadro, dtype=np.float64)
+    n = np.count_nonzero(~np.isnan(valores), axis=0)
+    # np.sort coloca os NaN ao final; inverte apenas a parte válida de cada coluna
+    crescente = np.sort(valores, axis=0)
+    i = n - 1 - np.arange(valores.shape[0])[:, np.newaxis]
+    vazoes = np.take_along_axis(crescente, np.maximum(i, 0), axis=0)
+    vazoes[i < 0] = np.nan
+    return CurvasPermanencia(pd.Index(quadro.columns), vazoes, n)
@@ -0,0 +1,148 @@
+# coding: utf-8
+"""Testes de permutação para a diferença entre dois períodos.
+
+Alternativa não paramétrica aos testes t de Student e de Welch da célula
+In[98]: a estatística (diferença das médias, das medianas ou das variâncias
+de X e Y) é recalculada com os rótulos dos períodos embaralhados, e o valor p
+é a fração das permutações com estatística tão extrema quanto a observada.
+
+As permutações são geradas em lotes, como uma matriz de índices (uma
+permutação por linha) produzida por numpy.random.Generator.permuted, e a
+estatística de todo o lote sai de uma operação vetorizada. Depois de cada
+lote é calculado o intervalo de confiança de Clopper-Pearson do valor p; a
+amostragem termina assim que o intervalo fica inteiramente acima ou abaixo
+de alfa, isto é, quando a decisão do teste não muda mais com novas
+permutações. Cada coluna tem o seu próprio gerador, derivado da semente, de
+modo que o resultado não depende do número de processos.
+"""
+
+from __future__ import division
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from hidroest.testes import ALTERNATIVAS, _colunas, _tabelas
+
+PERMUTACOES = 100000
+LOTE = 1000
+# limite de elementos da matriz de índices de um lote
+ELEMENTOS_LOTE = 1 << 22
+
+Permutacao = namedtuple('Permutacao',
+                        ['estatistica', 'p', 'permutacoes', 'inferior', 'superior'])
+
+
+def _media(x, y):
+    return x.mean(axis=-1) - y.mean(axis=-1)
+
+
+def _mediana(x, y):
+    return np.median(x, axis=-1) - np.median(y, axis=-1)
+
+
+def _variancia(x, y):
+    return x.var(axis=-1, ddof=1) - y.var(axis=-1, ddof=1)
+
+
+ESTATISTICAS = {'media': _media, 'mediana': _mediana, 'variancia': _variancia}
+
+
+def _intervalo(extremas, total, confianca):
+    # intervalo de Clopper-Pearson da proporção extremas / total
+    from scipy.special import betaincinv
+    cauda = (1 - confianca) / 2
+    inferior = betaincinv(extremas, total - extremas + 1, cauda) if extremas > 0 else 0.0
+    superior = (betaincinv(extremas + 1, total - extremas, 1 - cauda)
+                if extremas < total else 1.0)
+    return inferior, superior
+
+
+def teste_permutacao(x, y, estatistica='media', permutacoes=PERMUTACOES, lote=LOTE,
+                     alfa=0.05, confianca=0.99, alternativa='bilateral', semente=None):
+    """Teste de permutação da diferença entre as amostras x e y.
+
+    estatistica é um nome de ESTATISTICAS (diferença X - Y das médias,
+    medianas ou variâncias) ou uma função f(x, y) vetorizada no último eixo.
+    São geradas até permutacoes permutações, em lotes de lote; com alfa, a
+    amostragem é interrompida quando o intervalo de confiança (nível
+    confianca) do valor p não contém alfa (alfa=None desativa a parada
+    antecipada). semente é um inteiro, um SeedSequence ou um Generator.
+    Retorna Permutacao(estatistica, p, permutacoes, inferior, superior), com
+    p = (extremas + 1) / (permutacoes + 1).
+    """
+    if alternativa not in ALTERNATIVAS:
+        raise ValueError('alternativa deve ser uma de %s' % (ALTERNATIVAS,))
+    funcao = ESTATISTICAS[estatistica] if isinstance(estatistica, str) else estatistica
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x, y = x[~np.isnan(x)], y[~np.isnan(y)]
+    if x.size < 2 or y.size < 2:
+        return Permutacao(np.nan, np.nan, 0, np.nan, np.nan)
+    gerador = np.random.default_rng(semente)
+    todos = np.concatenate([x, y])
+    nx, N = x.size, todos.size
+    observado = funcao(x, y)
+    # tolerância para que permutações com a mesma estatística contem como extremas
+    margem = 1e-12 * max(abs(observado), np.abs(todos).max())
+    lote = max(1, min(lote, ELEMENTOS_LOTE // N))
+    indices = np.broadcast_to(np.arange(N), (lote, N))
+    extremas = total = 0
+    while total < permutacoes:
+        b = min(lote, permutacoes - total)
+        amostra = todos[gerador.permuted(indices[:b], axis=1)]
+        valores = funcao(amostra[:, :nx], amostra[:, nx:])
+        if alternativa == 'bilateral':
+            extremas += np.count_nonzero(np.abs(valores) >= abs(observado) - margem)
+        elif alternativa == 'maior':
+            extremas += np.count_nonzero(valores >= observado - margem)
+        else:
+            extremas += np.count_nonzero(valores <= observado + margem)
+        total += b
+        if alfa is not None and total < permutacoes:
+            inferior, superior = _intervalo(extremas, total, confianca)
+            if superior < alfa or inferior > alfa:
+                break
+    inferior, superior = _intervalo(extremas, total, confianca)
+    return Permutacao(observado, (extremas + 1) / (total + 1), total, inferior, superior)
+
+
+def _coluna(args):
+    # executado em um processo do pool para um par estação-coluna
+    x, y, opcoes = args
+    return teste_permutacao(x, y, **opcoes)
+
+
+def bateria_permutacao(tabelas, divisao, estatisticas=('media',),
+                       permutacoes=PERMUTACOES, colunas=None, coluna_ano='Ano',
+                       processos=1, semente=None, **opcoes):
+    """Testes de permutação de todas as colunas de todas as estações.
+
+    tabelas e colunas são como em testes.bateria; os anos <= divisao formam
+    a amostra X e os posteriores a amostra Y. estatisticas são nomes de
+    ESTATISTICAS. Com processos > 1 os pares estação-coluna são distribuídos
+    por um ProcessPoolExecutor. opcoes (lote, alfa, confianca, alternativa)
+    são repassadas a teste_permutacao. Retorna um DataFrame com uma linha
+    por estatística (coluna teste) e coluna, como testes.bateria.
+    """
+    if isinstance(estatisticas, str):
+        estatisticas = [estatisticas]
+    indice, _, X, Y = _colunas(_tabelas(tabelas), colunas, divisao, coluna_ano)
+    sementes = np.random.SeedSequence(semente).spawn(len(estatisticas) * len(indice))
+    tarefas, chaves = [], []
+    for estatistica in estatisticas:
+        for j, par in enumerate(indice):
+            argumentos = dict(opcoes, estatistica=estatistica, permutacoes=permutacoes,
+                              semente=sementes[len(tarefas)])
+            tarefas.append((X[:, j], Y[:, j], argumentos))
+            chaves.append(par + (estatistica,))
+    if processos <= 1:
+        resultados = [_coluna(t) for t in tarefas]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(processos) as pool:
+            resultados = list(pool.map(_coluna, tarefas,
+                                       chunksize=max(1, len(tarefas) // (4 * processos))))
+    nomes = list(indice.names) + ['teste']
+    return pd.DataFrame(resultados, index=pd.MultiIndex.from_tuples(chaves, names=nomes)
+                        ).reset_index()
@@ -0,0 +1,88 @@
+# coding: utf-8
+"""Posições de plotagem: probabilidades empíricas e tempos de retorno.
+
+As posições seguem a forma geral P = (m - a) / (N + 1 - 2a), em que m é a
+ordem da vazão e N o tamanho da amostra: Weibull (a = 0), Cunnane (a = 0,40),
+Gringorten (a = 0,44) e Hazen (a = 0,5). Para vazões máximas m = 1 é a maior
+vazão e P é a probabilidade de excedência; para vazões mínimas m = 1 é a
+menor vazão e P é a probabilidade de ocorrer uma vazão igual ou inferior.
+Em ambos os casos TR = 1/P.
+
+As amostras de todas as estações são ordenadas com um único argsort ao longo
+do eixo 0 (ver amostras.empilhar), sem ordenar nem alterar os DataFrames.
+"""
+
+from __future__ import division
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from hidroest.amostras import empilhar
+
+FORMULAS = {'weibull': 0.0, 'cunnane': 0.40, 'gringorten': 0.44, 'hazen': 0.5}
+EMPATES = ('media', 'min', 'max', 'ordinal')
+
+PosicoesPlotagem = namedtuple('PosicoesPlotagem', ['rank', 'prob', 'TR'])
+
+
+def ordens(valores, empates='media'):
+    """Ordem crescente (a partir de 1) de cada valor dentro da sua coluna.
+
+    empates define a ordem dos valores repetidos, como em pandas.rank:
+    'media', 'min', 'max' ou 'ordinal'. Falhas (NaN) recebem NaN.
+    """
+    if empates not in EMPATES:
+        raise ValueError('empates deve ser um de %s' % (EMPATES,))
+    indice = np.argsort(valores, axis=0, kind='stable')
+    ordenados = np.take_along_axis(valores, indice, axis=0)
+    linhas = ordenados.shape[0]
+    posicao = np.broadcast_to(
+        np.arange(1, linhas + 1, dtype=np.float64)[:, np.newaxis], ordenados.shape)
+    if empates == 'ordinal':
+        rank = posicao
+    else:
+        novo = np.ones(ordenados.shape, dtype=bool)
+        novo[1:] = ordenados[1:] != ordenados[:-1]
+        fim = np.ones(ordenados.shape, dtype=bool)
+        fim[:-1] = novo[1:]
+        # primeira e última posição do grupo de empates de cada valor
+        primeira = np.maximum.accumulate(np.where(novo, posicao, 0), axis=0)
+        ultima = np.minimum.accumulate(
+            np.where(fim, posicao, linhas + 1)[::-1], axis=0)[::-1]
+        rank = {'min': primeira, 'max': ultima,
+                'media': (primeira + ultima) / 2}[empates]
+    rank = np.where(np.isnan(ordenados), np.nan, rank)
+    resultado = np.empty(valores.shape)
+    np.put_along_axis(resultado, indice, rank, axis=0)
+    return resultado
+
+
+def posicoes(amostras, formula='weibull', tipo='maxima', empates='media'):
+    """Ordem, probabilidade empírica e TR de todas as amostras.
+
+    amostras segue as convenções de amostras.empilhar. Retorna arranjos
+    (observações x estações) na ordem original dos dados.
+    """
+    if formula not in FORMULAS:
+        raise ValueError('fórmula desconhecida: %s' % formula)
+    valores, _ = empilhar(amostras)
+    a = FORMULAS[formula]
+    n = np.count_nonzero(~np.isnan(valores), axis=0)
+    if tipo == 'maxima':
+        # ordem decrescente: os empates 'min' e 'max' trocam de papel
+        inverso = {'min': 'max', 'max': 'min'}.get(empates, empates)
+        rank = n + 1 - ordens(valores, inverso)
+    elif tipo == 'minima':
+        rank = ordens(valores, empates)
+    else:
+        raise ValueError("tipo deve ser 'maxima' ou 'minima'")
+    prob = (rank - a) / (n + 1 - 2 * a)
+    return PosicoesPlotagem(rank, prob, 1 / prob)
+
+
+def tabela_posicoes(serie, formula='weibull', tipo='maxima', empates='media'):
+    """Colunas Rank, Prob e TR de uma única série, com o mesmo índice."""
+    rank, prob, TR = posicoes(serie, formula, tipo, empates)
+    return pd.DataFrame({'Rank': rank[:, 0], 'Prob': prob[:, 0], 'TR': TR[:, 0]},
+                        index=serie.index)
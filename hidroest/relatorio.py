@@ -0,0 +1,206 @@
+# coding: utf-8
+"""Relatório de uma estação sem interface gráfica.
+
+calcular_relatorio() reúne os resultados numéricos das seções do notebook
+(estatísticas da série diária, resumo das séries anuais, relações entre elas,
+curva de permanência, extremos anuais, vazões máximas de projeto, Q7,10 e
+testes de hipóteses entre as duas metades do registro) em um dicionário de
+tabelas, e
+salvar_relatorio() grava essas tabelas em CSV, JSON ou Parquet. Nenhuma
+dessas etapas importa matplotlib ou seaborn, de modo que o relatório pode
+ser produzido em lote, fora do IPython. As figuras são uma etapa separada e
+opcional (figuras_relatorio()), que importa matplotlib apenas quando chamada
+e desenha a partir das tabelas já calculadas, sem refazer as contas.
+"""
+
+from __future__ import division
+import os
+
+import numpy as np
+import pandas as pd
+
+from hidroest.distribuicoes import ajustar
+from hidroest.extremos import (COBERTURA_MINIMA, extremos_anuais, minima_movel_anual,
+                               vazao_minima_tr)
+from hidroest.permanencia import vazao_permanencia
+from hidroest.posicao import tabela_posicoes
+from hidroest.serie import SerieDiaria
+from hidroest.suficientes import Suficientes
+from hidroest.testes import bateria
+
+TR_PADRAO = (2, 5, 10, 25, 50, 100, 500, 1000)
+PERCENT = np.arange(1, 100)
+FORMATOS = ('csv', 'json', 'parquet')
+SERIES_ANUAIS = ('media', 'maxima', 'minima')
+TESTES_RELATORIO = ('student', 'welch', 'f')
+
+
+def _serie(vazoes, coluna):
+    if isinstance(vazoes, SerieDiaria):
+        vazoes = vazoes.para_quadro()
+    if isinstance(vazoes, pd.DataFrame):
+        vazoes = vazoes[coluna]
+    return vazoes.sort_index()
+
+
+def _relacoes(anuais, colunas):
+    # correlação e reta de mínimos quadrados Y = a + b X (seção 7) de cada
+    # par de séries anuais, nos anos em que as duas existem
+    linhas = []
+    for i, x in enumerate(colunas):
+        for y in colunas[i + 1:]:
+            par = anuais[[x, y]].dropna().to_numpy(dtype=np.float64)
+            dx, dy = par[:, 0] - par[:, 0].mean(), par[:, 1] - par[:, 1].mean()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                b = (dx * dy).sum() / (dx * dx).sum()
+                r = (dx * dy).sum() / np.sqrt((dx * dx).sum() * (dy * dy).sum())
+            linhas.append({'x': x, 'y': y, 'n': len(par), 'correlacao': r,
+                           'a': par[:, 1].mean() - b * par[:, 0].mean(), 'b': b,
+                           'r2': r * r})
+    return pd.DataFrame(linhas).set_index(['x', 'y'])
+
+
+def calcular_relatorio(vazoes, coluna='VazaoD', mes_inicio=1, TR=TR_PADRAO,
+                       distribuicao='lognormal', metodo='momentos', divisao=None,
+                       cobertura_minima=COBERTURA_MINIMA):
+    """Resultados numéricos do relatório de uma estação.
+
+    vazoes é a série diária (Series, DataFrame com a coluna indicada ou
+    SerieDiaria). Retorna um dicionário de DataFrames: estatisticas,
+    resumo (média, desvio, coeficientes de variação e de assimetria... das
+    séries anuais), relacoes (correlação e reta ajustada entre elas),
+    permanencia, anuais, maximas (posições de plotagem de Weibull), projeto
+    (vazões máximas de projeto por TR), minimas (Q7 anual), referencias
+    (Q50, Q90, Q95 e Q7,10) e testes (Student, Welch e F das séries anuais
+    até o ano divisao contra as posteriores; padrão: metade do registro).
+    Os anos com menos de cobertura_minima dos dias com dados ficam em
+    anuais (com o número de dias), mas com os valores NaN e fora das
+    demais tabelas anuais.
+    """
+    serie = _serie(vazoes, coluna)
+    Q = vazao_permanencia(serie, PERCENT)
+    extremos = extremos_anuais(serie, mes_inicio, cobertura_minima)
+    anuais = pd.DataFrame({'media': extremos.media, 'maxima': extremos.maxima,
+                           'data_maxima': extremos.data_maxima,
+                           'minima': extremos.minima,
+                           'data_minima': extremos.data_minima,
+                           'dias': extremos.dias})
+    maxima = extremos.maxima.dropna()
+    maximas = maxima.to_frame('Qmax').join(tabela_posicoes(maxima))
+    TR = np.asarray(TR, dtype=np.float64)
+    projeto = pd.DataFrame({'Q': ajustar(maxima, distribuicao, metodo).quantis(TR)[0]},
+                           index=pd.Index(TR, name='TR'))
+    Q7 = minima_movel_anual(serie, 7, mes_inicio, cobertura_minima).dropna()
+    minimas = Q7.to_frame('Q7').join(tabela_posicoes(Q7, tipo='minima'))
+    referencias = pd.Series({'Q50': Q[49], 'Q90': Q[89], 'Q95': Q[94],
+                             'Q7_10': vazao_minima_tr(Q7, TR=10).iloc[0]})
+    colunas = list(SERIES_ANUAIS)
+    if divisao is None:
+        divisao = anuais.index[(len(anuais) - 1) // 2]
+    testes = bateria(anuais[colunas].rename_axis('Ano').reset_index(), divisao=divisao,
+                     testes=list(TESTES_RELATORIO), colunas=colunas)
+    return {'estatisticas': serie.describe().to_frame(coluna),
+            'resumo': Suficientes.de_valores(anuais[colunas]).tabela(),
+            'relacoes': _relacoes(anuais, colunas),
+            'permanencia': pd.DataFrame({coluna: Q},
+                                        index=pd.Index(PERCENT, name='Percent')),
+            'anuais': anuais,
+            'maximas': maximas,
+            'projeto': projeto,
+            'minimas': minimas,
+            'referencias': referencias.to_frame(coluna),
+            'testes': testes.drop(columns='estacao').set_index(['coluna', 'teste'])}
+
+
+def salvar_relatorio(resultados, diretorio, formato='csv'):
+    """Grava cada tabela do relatório em diretorio/<nome>.<formato>.
+
+    Retorna a lista de arquivos gravados. Parquet requer pyarrow.
+    """
+    if formato not in FORMATOS:
+        raise ValueError('formato deve ser um de %s' % (FORMATOS,))
+    if not os.path.isdir(diretorio):
+        os.makedirs(diretorio)
+    arquivos = []
+    for nome, tabela in resultados.items():
+        arquivo = os.path.join(diretorio, '%s.%s' % (nome, formato))
+        if formato == 'csv':
+            tabela.to_csv(arquivo)
+        elif formato == 'json':
+            tabela.to_json(arquivo, orient='table', date_format='iso')
+        else:
+            tabela.to_parquet(arquivo)
+        arquivos.append(arquivo)
+    return arquivos
+
+
+def figuras_relatorio(resultados, diretorio, formato='png'):
+    """Desenha as figuras a partir dos resultados de calcular_relatorio().
+
+    matplotlib é importado aqui, com o backend Agg (sem janela), apenas
+    quando as figuras são pedidas. Retorna a lista de arquivos gravados.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+
+    if not os.path.isdir(diretorio):
+        os.makedirs(diretorio)
+    arquivos = []
+
+    def gravar(fig, nome):
+        arquivo = os.path.join(diretorio, '%s.%s' % (nome, formato))
+        fig.savefig(arquivo)
+        plt.close(fig)
+        arquivos.append(arquivo)
+
+    permanencia = resultados['permanencia']
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.set_yscale('log')
+    ax.plot(permanencia.index, permanencia.iloc[:, 0])
+    ax.set_xlabel('Permanência (%)')
+    ax.set_ylabel('Vazão (m3/s)')
+    gravar(fig, 'permanencia')
+
+    anuais = resultados['anuais']
+    fig, ax = plt.subplots(figsize=(15, 7))
+    for coluna, cor in (('maxima', 'g'), ('media', 'b'), ('minima', 'r')):
+        ax.plot(anuais.index, anuais[coluna], marker='o', color=cor, label=coluna)
+    ax.set_xlabel('Ano')
+    ax.set_ylabel('Vazão (m3/s)')
+    ax.legend()
+    gravar(fig, 'anuais')
+
+    maximas, projeto = resultados['maximas'], resultados['projeto']
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.set_xscale('log')
+    ax.plot(maximas['TR'], maximas['Qmax'], 'o', label='Weibull')
+    ax.plot(projeto.index, projeto['Q'], label='ajuste')
+    ax.set_xlabel('TR (anos)')
+    ax.set_ylabel('Vazão máxima (m3/s)')
+    ax.legend()
+    gravar(fig, 'maximas')
+
+    minimas = resultados['minimas']
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.set_xscale('log')
+    ax.plot(minimas['TR'], minimas['Q7'], 'o')
+    ax.axhline(resultados['referencias'].loc['Q7_10'].iloc[0], color='r',
+               label='Q7,10')
+    ax.set_xlabel('TR (anos)')
+    ax.set_ylabel('Q7 (m3/s)')
+    ax.legend()
+    gravar(fig, 'minimas')
+    return arquivos
+
+
+def relatorio(vazoes, diretorio, formato='csv', com_figuras=False, **opcoes):
+    """Calcula e grava o relatório; as figuras só são geradas se pedidas.
+
+    opcoes são repassadas a calcular_relatorio(). Retorna os arquivos gravados.
+    """
+    resultados = calcular_relatorio(vazoes, **opcoes)
+    arquivos = salvar_relatorio(resultados, diretorio, formato)
+    if com_figuras:
+        arquivos += figuras_relatorio(resultados, diretorio)
+    return arquivos
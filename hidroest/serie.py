@@ -0,0 +1,125 @@
+# coding: utf-8
+"""Série diária compacta: data inicial, frequência e um buffer float32.
+
+Um DataFrame de vazões diárias guarda um índice datetime64 (8 bytes por dia)
+e valores float64; para uma rede com milhares de estações isso ocupa vários
+GB. SerieDiaria guarda apenas a data inicial, a frequência e os valores
+(dias, ou dias x estações) em float32, com uma máscara opcional de falhas.
+O índice de datas é gerado quando necessário e as fatias por datas são
+calculadas aritmeticamente, devolvendo vistas do mesmo buffer, sem cópia.
+
+As funções de extremos e de permanência aceitam SerieDiaria diretamente.
+"""
+
+from __future__ import division
+import numpy as np
+import pandas as pd
+
+
+class SerieDiaria(object):
+    """Série regular de vazões com índice de datas implícito.
+
+    valores tem forma (dias,) para uma estação ou (dias, estações); colunas
+    são os nomes das estações. mascara, se informada, tem a forma de valores
+    e marca com True as falhas (tratadas como NaN nos cálculos).
+    """
+
+    def __init__(self, inicio, valores, colunas=None, freq='D', mascara=None):
+        self.inicio = pd.Timestamp(inicio)
+        self.freq = freq
+        # só frequências de passo fixo (dias, horas...)
+        datas = pd.date_range(self.inicio, periods=2, freq=freq)
+        self.passo = datas[1] - datas[0]
+        self.valores = np.asarray(valores)
+        if colunas is None:
+            colunas = range(1 if self.valores.ndim == 1 else self.valores.shape[1])
+        self.colunas = list(colunas)
+        if mascara is not None:
+            mascara = np.asarray(mascara, dtype=bool)
+            if mascara.shape != self.valores.shape:
+                raise ValueError('mascara deve ter a forma dos valores')
+        self.mascara = mascara
+
+    @classmethod
+    def de_quadro(cls, quadro, dtype=np.float32, freq='D'):
+        """Converte um DataFrame (ou Series) com índice de datas.
+
+        Datas ausentes no índice são completadas com NaN, de modo que a
+        série fique regular na frequência indicada.
+        """
+        indice = pd.DatetimeIndex(quadro.index)
+        if not indice.is_monotonic_increasing:
+            quadro = quadro.sort_index()
+            indice = pd.DatetimeIndex(quadro.index)
+        completo = pd.date_range(indice[0], indice[-1], freq=freq)
+        if len(completo) != len(indice) or not completo.equals(indice):
+            quadro = quadro[~indice.duplicated()].reindex(completo)
+        if isinstance(quadro, pd.Series):
+            colunas = [quadro.name]
+        else:
+            colunas = list(quadro.columns)
+        return cls(completo[0], quadro.to_numpy(dtype=dtype), colunas, freq)
+
+    @property
+    def fim(self):
+        return self.inicio + (len(self) - 1) * self.passo
+
+    @property
+    def indice(self):
+        return pd.date_range(self.inicio, periods=len(self), freq=self.freq)
+
+    @property
+    def nbytes(self):
+        return self.valores.nbytes + (0 if self.mascara is None else self.mascara.nbytes)
+
+    def __len__(self):
+        return self.valores.shape[0]
+
+    def __repr__(self):
+        return 'SerieDiaria(%s a %s, %d estações, %s)' % (
+            self.inicio.date(), self.fim.date(), len(self.colunas), self.valores.dtype)
+
+    def posicao(self, data):
+        """Posição (inteira) da data na série; pode cair fora dos limites."""
+        return (pd.Timestamp(data) - self.inicio) // self.passo
+
+    def fatia(self, inicio=None, fim=None):
+        """Vista entre duas datas, inclusive, como a seleção df[inicio:fim]."""
+        a = 0 if inicio is None else max(-(-(pd.Timestamp(inicio) - self.inicio)
+                                           // self.passo), 0)
+        b = len(self) if fim is None else max(self.posicao(fim) + 1, 0)
+        mascara = None if self.mascara is None else self.mascara[a:b]
+        return SerieDiaria(self.inicio + a * self.passo, self.valores[a:b],
+                           self.colunas, self.freq, mascara)
+
+    def coluna(self, nome):
+        """Vista (dias,) de uma estação."""
+        j = self.colunas.index(nome)
+        if self.valores.ndim == 1:
+            return self
+        mascara = None if self.mascara is None else self.mascara[:, j]
+        return SerieDiaria(self.inicio, self.valores[:, j], [nome], self.freq, mascara)
+
+    def __getitem__(self, chave):
+        if isinstance(chave, slice):
+            if chave.step is not None:
+                raise ValueError('fatias por data não aceitam passo')
+            return self.fatia(chave.start, chave.stop)
+        return self.coluna(chave)
+
+    def preenchida(self, dtype=np.float64):
+        """Cópia dos valores no tipo indicado, com NaN nas falhas da máscara."""
+        valores = self.valores.astype(dtype)
+        if self.mascara is not None:
+            valores[self.mascara] = np.nan
+        return valores
+
+    def __array__(self, dtype=None, copy=None):
+        return self.preenchida(np.float64 if dtype is None else dtype)
+
+    def para_quadro(self, dtype=np.float64):
+        """DataFrame (ou Series, para uma estação) com o índice de datas."""
+        valores = self.preenchida(dtype)
+        if valores.ndim == 1:
+            return pd.Series(valores, index=self.indice, name=self.colunas[0])
+        return pd.DataFrame(valores, index=self.indice, columns=self.colunas)
@@ -0,0 +1,63 @@
+# coding: utf-8
+"""Simulação de Monte Carlo com numpy.random.Generator.
+
+Os sorteios são feitos em blocos vetorizados e as frequências acumuladas são
+obtidas por soma acumulada, de modo que simulações muito longas podem ser
+percorridas bloco a bloco com memória limitada. Fluxos independentes para
+processos paralelos são derivados de uma única semente com SeedSequence.
+"""
+
+from __future__ import division
+import numpy as np
+
+BLOCO = 1 << 20
+
+
+def geradores(semente=None, n=1):
+    """n geradores independentes e reprodutíveis derivados da mesma semente."""
+    return [np.random.default_rng(s) for s in np.random.SeedSequence(semente).spawn(n)]
+
+
+def blocos_frequencia(p=0.5, lancamentos=1000, sequencias=1, semente=None,
+                      bloco=BLOCO):
+    """Percorre a frequência acumulada de sucessos em blocos.
+
+    Cada sequência é uma série de lançamentos independentes com probabilidade
+    de sucesso p. A cada bloco de até `bloco` lançamentos é gerado o par
+    (lance, frequencia): lance é o número do lançamento (a partir de 1) e
+    frequencia tem forma (len(lance), sequencias) com a proporção de
+    sucessos até aquele lançamento.
+    """
+    rng = np.random.default_rng(semente)
+    sucessos = np.zeros(sequencias, dtype=np.int64)
+    for inicio in range(0, lancamentos, bloco):
+        fim = min(inicio + bloco, lancamentos)
+        sorteio = rng.random((fim - inicio, sequencias)) < p
+        acumulado = sucessos + np.cumsum(sorteio, axis=0)
+        sucessos = acumulado[-1]
+        lance = np.arange(inicio + 1, fim + 1)
+        yield lance, acumulado / lance[:, np.newaxis]
+
+
+def frequencia_acumulada(p=0.5, lancamentos=1000, sequencias=1, semente=None):
+    """Frequência acumulada de sucessos (lancamentos x sequencias).
+
+    Equivale ao laço de lançamentos de moeda da célula In[58] com p=0.5.
+    """
+    return np.concatenate([f for _, f in blocos_frequencia(p, lancamentos, sequencias,
+                                                          semente)])
+
+
+def risco_simulado(TR, anos, simulacoes=1000000, semente=None, bloco=BLOCO):
+    """Probabilidade de ao menos uma excedência da cheia de TR anos em `anos` anos.
+
+    Estimativa por Monte Carlo, em blocos de simulações; o valor analítico
+    é 1 - (1 - 1/TR)**anos.
+    """
+    rng = np.random.default_rng(semente)
+    falhas = 0
+    for inicio in range(0, simulacoes, bloco):
+        n = min(bloco, simulacoes - inicio)
+        # número de excedências em cada período de `anos` anos
+        falhas += np.count_nonzero(rng.binomial(anos, 1 / TR, size=n))
+    return falhas / simulacoes
@@ -0,0 +1,117 @@
+# coding: utf-8
+"""Geração de séries sintéticas de vazões mensais (modelo de Thomas-Fiering).
+
+O modelo é um AR(1) com parâmetros sazonais: para o mês m,
+
+    Q[t] = media[m] + b[m] * (Q[t-1] - media[m-1]) + e * desvio[m] * sqrt(1 - r[m]**2)
+
+com b[m] = r[m] * desvio[m] / desvio[m-1], r[m] a correlação entre as vazões
+do mês m e do mês anterior e e um ruído normal padrão. Os parâmetros são
+estimados de uma série mensal como a de vazoes_cuiaba.xlsx.
+
+As séries são geradas em um arranjo pré-alocado (series, meses); a recursão
+percorre os meses e é vetorizada ao longo das séries. Para estudos de
+reservatórios com muitas séries longas o resultado pode ser gravado em disco
+em blocos de séries, em um arquivo .npy mapeado em memória.
+"""
+
+from __future__ import division
+import numpy as np
+import pandas as pd
+
+BLOCO = 1000
+
+
+def ajustar_thomas_fiering(vazoes, log=False):
+    """Média, desvio padrão e correlação lag-1 de cada mês.
+
+    vazoes é uma Series (ou DataFrame de uma coluna) de vazões mensais com
+    índice de datas; meses ausentes são tratados como falhas. Com log=True
+    os parâmetros são estimados para os logaritmos naturais das vazões.
+    Retorna um DataFrame indexado pelo mês (1 a 12) com as colunas media,
+    desvio, r e b.
+    """
+    if isinstance(vazoes, pd.DataFrame):
+        vazoes = vazoes.iloc[:, 0]
+    vazoes = vazoes.sort_index()
+    vazoes.index = pd.DatetimeIndex(vazoes.index).to_period('M')
+    vazoes = vazoes[~vazoes.index.duplicated()]
+    # asfreq não cria os meses ausentes de um PeriodIndex: sem eles, shift(1)
+    # emparelharia meses que não são consecutivos
+    vazoes = vazoes.reindex(pd.period_range(vazoes.index.min(), vazoes.index.max(),
+                                            freq='M'))
+    if log:
+        vazoes = np.log(vazoes)
+    anterior = vazoes.shift(1)
+    mes = vazoes.index.month
+    grupos = vazoes.groupby(mes)
+    media = grupos.mean()
+    desvio = grupos.std()
+    r = pd.Series([vazoes[mes == m].corr(anterior[mes == m]) for m in range(1, 13)],
+                  index=media.index)
+    b = r * desvio / desvio.reindex(np.roll(desvio.index, 1)).to_numpy()
+    parametros = pd.DataFrame({'media': media, 'desvio': desvio, 'r': r, 'b': b})
+    parametros.index.name = 'Mes'
+    parametros.attrs['log'] = log
+    return parametros
+
+
+def _recursao(saida, parametros, mes_inicio, rng, log):
+    series, meses = saida.shape
+    media = parametros['media'].to_numpy()
+    desvio = parametros['desvio'].to_numpy()
+    b = parametros['b'].to_numpy()
+    ruido = desvio * np.sqrt(1 - parametros['r'].to_numpy() ** 2)
+    m = mes_inicio - 1
+    anterior = media[m] + desvio[m] * rng.standard_normal(series)
+    saida[:, 0] = anterior
+    for t in range(1, meses):
+        m_ant, m = m, (m + 1) % 12
+        anterior = (media[m] + b[m] * (anterior - media[m_ant]) +
+                    ruido[m] * rng.standard_normal(series))
+        saida[:, t] = anterior
+    if log:
+        np.exp(saida, out=saida)
+    else:
+        # o modelo pode gerar vazões negativas, que são truncadas em zero
+        np.maximum(saida, 0, out=saida)
+    return saida
+
+
+def gerar(parametros, anos, series=1, mes_inicio=1, semente=None, log=None):
+    """Gera séries sintéticas mensais com o modelo de Thomas-Fiering.
+
+    Retorna um arranjo (series, anos * 12) começando no mês mes_inicio.
+    log indica se os parâmetros foram estimados com log=True; por padrão usa
+    o valor registrado por ajustar_thomas_fiering.
+    """
+    if log is None:
+        log = parametros.attrs.get('log', False)
+    rng = np.random.default_rng(semente)
+    saida = np.empty((series, anos * 12))
+    return _recursao(saida, parametros, mes_inicio, rng, log)
+
+
+def gerar_em_arquivo(parametros, arquivo, anos, series, mes_inicio=1, semente=None,
+                     log=None, bloco=BLOCO, dtype=np.float32):
+    """Gera as séries em blocos e grava em um arquivo .npy (series, anos * 12).
+
+    Apenas um bloco de séries fica na memória de cada vez. Cada bloco usa um
+    fluxo de números aleatórios próprio derivado da semente (SeedSequence),
+    o que torna o resultado reprodutível para a mesma semente e o mesmo
+    tamanho de bloco. Retorna o arquivo aberto como memmap somente leitura.
+    """
+    if log is None:
+        log = parametros.attrs.get('log', False)
+    destino = np.lib.format.open_memmap(arquivo, mode='w+', dtype=dtype,
+                                        shape=(series, anos * 12))
+    inicios = range(0, series, bloco)
+    sementes = np.random.SeedSequence(semente).spawn(len(inicios))
+    for inicio, s in zip(inicios, sementes):
+        fim = min(inicio + bloco, series)
+        saida = np.empty((fim - inicio, anos * 12))
+        destino[inicio:fim] = _recursao(saida, parametros, mes_inicio,
+                                        np.random.default_rng(s), log)
+    destino.flush()
+    del destino
+    return np.load(arquivo, mmap_mode='r')
@@ -0,0 +1,177 @@
+# coding: utf-8
+"""Estatísticas suficientes de colunas de dados, combináveis entre subconjuntos.
+
+Para cada coluna são guardados o tamanho, a média, as somas dos desvios em
+relação à média elevados a 2, 3 e 4 e os valores mínimo e máximo. Deles saem
+a soma, a soma dos quadrados, a variância, o desvio padrão, o coeficiente de
+variação, a assimetria e a curtose, e os testes de hipóteses (testes.testar)
+trabalham apenas com eles. Estatísticas de dois subconjuntos, como os anos
+até 1968 e os posteriores da célula In[98], são combinadas pelas fórmulas de
+Chan e Pébay (atualização de Welford por pares) sem voltar aos dados.
+
+suficientes_planilha guarda o resultado em memória, identificado pela mesma
+chave de arquivo do cache de leitura: enquanto a planilha não mudar, as
+estatísticas não são recalculadas.
+"""
+
+from __future__ import division
+from collections import namedtuple
+import os
+
+import numpy as np
+import pandas as pd
+
+from hidroest.leitura import chave_arquivo, ler_excel
+
+Periodos = namedtuple('Periodos', ['todos', 'antes', 'depois'])
+
+_CACHE = {}
+
+
+class Suficientes(object):
+    """Estatísticas suficientes de cada coluna (vetores com um valor por coluna).
+
+    m2, m3 e m4 são as somas dos desvios em relação à média elevados a 2, 3
+    e 4. Colunas sem dados têm n = 0 e média NaN.
+    """
+
+    def __init__(self, n, media, m2, m3, m4, minimo, maximo, colunas=None):
+        self.n = np.asarray(n, dtype=np.int64)
+        self.media = np.asarray(media, dtype=np.float64)
+        self.m2 = np.asarray(m2, dtype=np.float64)
+        self.m3 = np.asarray(m3, dtype=np.float64)
+        self.m4 = np.asarray(m4, dtype=np.float64)
+        self.minimo = np.asarray(minimo, dtype=np.float64)
+        self.maximo = np.asarray(maximo, dtype=np.float64)
+        if colunas is None:
+            colunas = pd.RangeIndex(self.n.size)
+        self.colunas = colunas if isinstance(colunas, pd.Index) else pd.Index(colunas)
+
+    @classmethod
+    def de_valores(cls, valores, colunas=None):
+        """Estatísticas de cada coluna de um arranjo (observações x colunas).
+
+        Falhas (NaN) são ignoradas. Os momentos são calculados em duas
+        passadas (média e depois os desvios), que é numericamente estável.
+        """
+        if isinstance(valores, pd.DataFrame):
+            colunas = valores.columns if colunas is None else colunas
+        valores = np.asarray(valores, dtype=np.float64)
+        if valores.ndim == 1:
+            valores = valores[:, np.newaxis]
+        valido = ~np.isnan(valores)
+        n = np.count_nonzero(valido, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = np.where(valido, valores, 0).sum(axis=0) / n
+            d = np.where(valido, valores - media, 0)
+            d2 = d * d
+            m2 = d2.sum(axis=0)
+            m3 = (d2 * d).sum(axis=0)
+            m4 = (d2 * d2).sum(axis=0)
+        minimo = np.where(n > 0, np.where(valido, valores, np.inf).min(axis=0), np.nan)
+        maximo = np.where(n > 0, np.where(valido, valores, -np.inf).max(axis=0), np.nan)
+        return cls(n, media, m2, m3, m4, minimo, maximo, colunas)
+
+    def combinar(self, outro):
+        """Estatísticas da união dos dois conjuntos de dados (mesmas colunas)."""
+        na, nb = self.n.astype(np.float64), outro.n.astype(np.float64)
+        n = na + nb
+        ma = np.where(na > 0, self.media, 0)
+        mb = np.where(nb > 0, outro.media, 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            d = np.where((na > 0) & (nb > 0), mb - ma, 0)
+            media = np.where(n > 0, (na * ma + nb * mb) / n, np.nan)
+            m2 = self.m2 + outro.m2 + d ** 2 * na * nb / n
+            m3 = (self.m3 + outro.m3 + d ** 3 * na * nb * (na - nb) / n ** 2 +
+                  3 * d * (na * outro.m2 - nb * self.m2) / n)
+            m4 = (self.m4 + outro.m4 +
+                  d ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / n ** 3 +
+                  6 * d ** 2 * (na ** 2 * outro.m2 + nb ** 2 * self.m2) / n ** 2 +
+                  4 * d * (na * outro.m3 - nb * self.m3) / n)
+        vazio = n == 0
+        m2, m3, m4 = (np.where(vazio, 0, m) for m in (m2, m3, m4))
+        return Suficientes(n.astype(np.int64), media, m2, m3, m4,
+                           np.fmin(self.minimo, outro.minimo),
+                           np.fmax(self.maximo, outro.maximo), self.colunas)
+
+    __add__ = combinar
+
+    @property
+    def soma(self):
+        return np.where(self.n > 0, self.n * self.media, 0)
+
+    @property
+    def soma_quadrados(self):
+        return np.where(self.n > 0, self.m2 + self.n * self.media ** 2, 0)
+
+    @property
+    def variancia(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.n > 1, self.m2 / (self.n - 1), np.nan)
+
+    @property
+    def desvio(self):
+        return np.sqrt(self.variancia)
+
+    @property
+    def cv(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.desvio / self.media
+
+    @property
+    def assimetria(self):
+        """Coeficiente de assimetria corrigido, como em pandas.skew()."""
+        n = self.n.astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            g = n / ((n - 1) * (n - 2)) * self.m3 / self.desvio ** 3
+        return np.where(n > 2, g, np.nan)
+
+    @property
+    def curtose(self):
+        """Excesso de curtose corrigido, como em pandas.kurt()."""
+        n = self.n.astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            k = (n * (n + 1) * (n - 1) * self.m4 / ((n - 2) * (n - 3) * self.m2 ** 2) -
+                 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+        return np.where(n > 3, k, np.nan)
+
+    def tabela(self):
+        """DataFrame com uma linha por coluna e as estatísticas derivadas."""
+        return pd.DataFrame({'n': self.n, 'media': self.media, 'desvio': self.desvio,
+                             'variancia': self.variancia, 'cv': self.cv,
+                             'assimetria': self.assimetria, 'curtose': self.curtose,
+                             'minimo': self.minimo, 'maximo': self.maximo},
+                            index=self.colunas)
+
+
+def suficientes_planilha(arquivo, colunas=None, divisao=None, coluna_ano='Ano',
+                         sheet_name=0):
+    """Estatísticas suficientes das colunas de uma planilha, guardadas em memória.
+
+    colunas padrão: todas as colunas numéricas exceto coluna_ano. Com
+    divisao, as estatísticas são calculadas para os anos <= divisao (antes)
+    e posteriores (depois), e as do período todo saem da combinação das
+    duas. Retorna Periodos(todos, antes, depois); sem divisao antes e depois
+    são None. O resultado é reaproveitado enquanto a planilha não mudar.
+    """
+    chave = (os.path.abspath(arquivo), sheet_name, chave_arquivo(arquivo),
+             None if colunas is None else tuple(colunas), divisao, coluna_ano)
+    if chave not in _CACHE:
+        # descarta estatísticas de versões anteriores da mesma planilha
+        for antiga in [c for c in _CACHE if c[:2] == chave[:2] and c[2] != chave[2]]:
+            del _CACHE[antiga]
+        tabela = ler_excel(arquivo, sheet_name=sheet_name)
+        if colunas is None:
+            colunas = [c for c in tabela.select_dtypes('number').columns
+                       if c != coluna_ano]
+        valores = tabela[colunas]
+        nomes = pd.Index(colunas, name='coluna')
+        if divisao is None:
+            periodos = Periodos(Suficientes.de_valores(valores, nomes), None, None)
+        else:
+            ate = (tabela[coluna_ano] <= divisao).to_numpy()
+            antes = Suficientes.de_valores(valores[ate], nomes)
+            depois = Suficientes.de_valores(valores[~ate], nomes)
+            periodos = Periodos(antes + depois, antes, depois)
+        _CACHE[chave] = periodos
+    return _CACHE[chave]
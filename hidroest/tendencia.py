@@ -0,0 +1,384 @@
+# coding: utf-8
+"""Testes de tendência e de estacionariedade em lote.
+
+Mann-Kendall (com correção da variância para empates e, opcionalmente, para a
+autocorrelação, de Hamed e Rao), inclinação de Sen e ponto de mudança de
+Pettitt, aplicados a todas as colunas de uma tabela (estações, ou os meses
+de VMM_ParaopebaAnoCivil.xlsx) de uma vez.
+
+A estatística S de Mann-Kendall não é calculada pelos n(n-1)/2 pares: S é o
+número de pares concordantes menos o de discordantes, e os discordantes são
+as inversões da permutação dos postos da série. As inversões são contadas em
+O(n log n) por uma partição estável bit a bit dos postos (como em uma
+ordenação radix a partir do bit mais significativo), com operações
+vetorizadas sobre todas as colunas. A mediana das inclinações de Sen é
+calculada diretamente dos pares nas séries de até alguns milhares de
+valores; nas mais longas ela sai da mesma contagem: o número de inclinações
+menores que b é o número de inversões da série x - b t, e a mediana é
+encontrada por bissecção em b, a partir de um intervalo tirado de uma
+amostra de pares, até que só ela reste no intervalo.
+"""
+
+from __future__ import division
+
+import numpy as np
+import pandas as pd
+
+from hidroest.testes import ALTERNATIVAS, _valor_p
+
+TOLERANCIA_SEN = 1e-12
+# colunas com até PARES_SEN pares têm as inclinações de Sen calculadas
+# diretamente, em blocos de até ELEMENTOS_SEN inclinações
+PARES_SEN = 1 << 22
+ELEMENTOS_SEN = 1 << 24
+# pares sorteados para o intervalo inicial da bissecção
+AMOSTRA_SEN = 4096
+
+
+def _preparar(series, tempo=None):
+    # (valores, tempo, n, colunas): valores (observações x colunas) com as
+    # falhas de cada coluna movidas para o fim e o tempo correspondente
+    if isinstance(series, pd.Series):
+        series = series.to_frame()
+    if isinstance(series, pd.DataFrame):
+        colunas = series.columns
+        if tempo is None and pd.api.types.is_numeric_dtype(series.index):
+            tempo = series.index
+        valores = series.to_numpy(dtype=np.float64)
+    else:
+        valores = np.asarray(series, dtype=np.float64)
+        if valores.ndim == 1:
+            valores = valores[:, np.newaxis]
+        colunas = pd.RangeIndex(valores.shape[1])
+    if tempo is None:
+        tempo = np.arange(len(valores))
+    tempo = np.asarray(tempo, dtype=np.float64)
+    if len(tempo) != len(valores):
+        raise ValueError('tempo deve ter um valor por observação')
+    ordem = np.argsort(tempo, kind='stable')
+    valores, tempo = valores[ordem], tempo[ordem]
+    if (np.diff(tempo) == 0).any():
+        raise ValueError('o tempo não pode ter valores repetidos')
+    falha = np.isnan(valores)
+    ordem = np.argsort(falha, axis=0, kind='stable')
+    valores = np.take_along_axis(valores, ordem, axis=0)
+    tempo = np.where(np.take_along_axis(falha, ordem, axis=0), np.nan, tempo[ordem])
+    return valores, tempo, len(valores) - falha.sum(axis=0), colunas
+
+
+def _permutacao(valores):
+    # posto (0 a n-1) de cada observação; empates e falhas seguem a ordem do
+    # tempo, de modo que não formam inversões
+    ordem = np.argsort(valores, axis=0, kind='stable')
+    postos = np.empty_like(ordem)
+    np.put_along_axis(postos, ordem, np.arange(len(valores))[:, np.newaxis], axis=0)
+    return postos, ordem
+
+
+def inversoes(permutacao):
+    """Número de inversões (i < j com p[i] > p[j]) de cada coluna.
+
+    Cada coluna de permutacao deve ser uma permutação de 0 a n-1. No nível
+    s os postos estão agrupados pelo prefixo p >> s, em ordem de tempo
+    dentro de cada grupo; as inversões cujo bit mais significativo distinto
+    é s-1 são contadas no grupo e o grupo é dividido de forma estável por
+    esse bit. São log2(n) níveis de custo linear.
+    """
+    p = np.asarray(permutacao)
+    if p.ndim == 1:
+        p = p[:, np.newaxis]
+    n, m = p.shape
+    # uma linha por coluna, contígua, e índices planos para np.take/np.put
+    tipo = np.int32 if n * m < 2 ** 31 else np.int64
+    p = np.ascontiguousarray(p.T, dtype=tipo)
+    posicao = np.arange(n, dtype=tipo)
+    deslocamento = (np.arange(m, dtype=tipo) * n)[:, np.newaxis]
+    total = np.zeros(m, dtype=np.int64)
+    for s in range(max(n - 1, 0).bit_length(), 0, -1):
+        bit = (p >> (s - 1)) & 1
+        inicio = (p >> s) << s
+        acumulado = np.cumsum(bit, axis=1, dtype=tipo)
+        anteriores = acumulado - bit
+        base = np.take(anteriores, inicio + deslocamento)
+        uns = anteriores - base
+        total += np.where(bit == 0, uns, 0).sum(axis=1)
+        fim = np.minimum(inicio + (1 << s), n)
+        zeros_grupo = (fim - inicio) - (np.take(acumulado, fim - 1 + deslocamento) - base)
+        destino = np.where(bit == 0, posicao - uns, inicio + zeros_grupo + uns)
+        novo = np.empty_like(p)
+        np.put(novo, destino + deslocamento, p)
+        p = novo
+    return total
+
+
+def _empates(valores, ordem):
+    # somas de t(t-1)/2 e de t(t-1)(2t+5) sobre os grupos de valores iguais,
+    # e o posto médio (a partir de 1) de cada valor ordenado
+    ordenados = np.take_along_axis(valores, ordem, axis=0)
+    n = len(valores)
+    novo = np.ones(ordenados.shape, dtype=bool)
+    novo[1:] = ordenados[1:] != ordenados[:-1]
+    linhas = np.arange(n)[:, np.newaxis]
+    inicio = np.maximum.accumulate(np.where(novo, linhas, 0), axis=0)
+    ultimo = np.ones(ordenados.shape, dtype=bool)
+    ultimo[:-1] = novo[1:]
+    fim = np.minimum.accumulate(np.where(ultimo, linhas, n)[::-1], axis=0)[::-1]
+    k = (linhas - inicio).astype(np.float64)
+
+    def f(t):
+        return t * (t - 1) * (2 * t + 5)
+
+    return k.sum(axis=0), (f(k + 1) - f(k)).sum(axis=0), (inicio + fim) / 2 + 1
+
+
+def _estatistica_s(valores, n):
+    postos, ordem = _permutacao(valores)
+    pares_empatados, correcao, _ = _empates(valores, ordem)
+    pares = n * (n - 1) / 2
+    return pares - pares_empatados - 2 * inversoes(postos), correcao
+
+
+def _pares(valores, tempo, n, k):
+    # k-ésimas menores inclinações (k: estatísticas x colunas) calculadas
+    # diretamente dos n(n-1)/2 pares, em blocos de colunas de mesmo tamanho
+    b = np.full(k.shape, np.nan)
+    for tamanho in np.unique(n[n > 1]):
+        i, j = np.triu_indices(tamanho, 1)
+        colunas = np.flatnonzero(n == tamanho)
+        bloco = max(1, ELEMENTOS_SEN // len(i))
+        for inicio in range(0, len(colunas), bloco):
+            c = colunas[inicio:inicio + bloco]
+            x, t = valores[:tamanho, c], tempo[:tamanho, c]
+            inclinacoes = (x[j] - x[i]) / (t[j] - t[i])
+            for coluna, inclinacao in zip(c, inclinacoes.T):
+                ordens = k[:, coluna].astype(np.int64) - 1
+                b[:, coluna] = np.partition(inclinacao, np.unique(ordens))[ordens]
+    return b
+
+
+def _bisseccao(valores, tempo, n, k):
+    # k-ésima menor inclinação (x_j - x_i) / (t_j - t_i), i < j, de cada
+    # coluna, por bissecção: há k' inclinações menores que b se a série
+    # x - b t tem k' inversões. O intervalo inicial vem dos quantis de uma
+    # amostra de pares; o novo ponto é interpolado entre os números de
+    # inclinações abaixo de baixo e de alto (com o passo ampliado quando o
+    # mesmo lado se move seguidamente) e a busca para quando só a k-ésima
+    # inclinação fica entre baixo e alto
+    amplitude = np.fmax.reduce(valores, axis=0) - np.fmin.reduce(valores, axis=0)
+    with np.errstate(invalid='ignore'):
+        passo = np.fmin.reduce(np.diff(tempo, axis=0), axis=0)
+        limite = np.where(np.isfinite(passo), amplitude / passo, 0) + 1
+    baixo, alto = -limite, limite.copy()
+    # número de inclinações menores que baixo e que alto
+    abaixo_baixo = np.zeros(len(k), dtype=np.int64)
+    abaixo_alto = n * (n - 1) // 2
+
+    def contar(pontos, colunas):
+        # inclinações menores que cada ponto; o ponto passa a ser baixo ou
+        # alto conforme fique abaixo ou acima da k-ésima inclinação
+        y = valores[:, colunas] - pontos * tempo[:, colunas]
+        menores = inversoes(_permutacao(y)[0])
+        abaixo = menores < k[colunas]
+        dentro = np.where(abaixo, pontos > baixo[colunas], pontos < alto[colunas])
+        for lado, contagem, mover in ((baixo, abaixo_baixo, abaixo),
+                                      (alto, abaixo_alto, ~abaixo)):
+            indices = colunas[mover & dentro]
+            lado[indices] = pontos[mover & dentro]
+            contagem[indices] = menores[mover & dentro]
+        return abaixo
+
+    # quantis (k - 0.5) / pares +- 4 erros-padrão de AMOSTRA_SEN pares
+    gerador = np.random.default_rng(0)
+    i = np.floor(gerador.random((AMOSTRA_SEN, len(k))) * n).astype(np.int64)
+    j = (i + 1 + np.floor(gerador.random(i.shape) * (n - 1)).astype(np.int64)) % n
+    amostra = np.sort((np.take_along_axis(valores, j, axis=0) -
+                       np.take_along_axis(valores, i, axis=0)) /
+                      (np.take_along_axis(tempo, j, axis=0) -
+                       np.take_along_axis(tempo, i, axis=0)), axis=0)
+    q = (k - 0.5) / abaixo_alto
+    erro = 4 * np.sqrt(q * (1 - q) / AMOSTRA_SEN) + 1 / AMOSTRA_SEN
+    posicoes = np.clip(np.floor(np.stack([q - erro, q + erro]) * AMOSTRA_SEN),
+                       0, AMOSTRA_SEN - 1).astype(np.int64)
+    colunas = np.arange(len(k))
+    contar(np.take_along_axis(amostra, posicoes, axis=0).ravel(),
+           np.concatenate([colunas, colunas]))
+    ativo = np.ones(len(k), dtype=bool)
+    lado = np.zeros(len(k), dtype=bool)
+    passo = np.ones(len(k))
+    while True:
+        largura = TOLERANCIA_SEN * (np.abs(baixo) + np.abs(alto) + limite)
+        ativo &= (abaixo_alto - abaixo_baixo > 1) & (alto - baixo > largura)
+        if not ativo.any():
+            break
+        colunas = np.flatnonzero(ativo)
+        fracao = ((k[colunas] - 0.5 - abaixo_baixo[colunas]) /
+                  (abaixo_alto[colunas] - abaixo_baixo[colunas]))
+        # ampliado, o passo afasta o ponto do lado que se moveu por último
+        fracao = np.where(lado[colunas], fracao * passo[colunas],
+                          1 - (1 - fracao) * passo[colunas])
+        fracao = np.clip(fracao, 1 / 64, 63 / 64)
+        abaixo = contar(baixo[colunas] + fracao * (alto[colunas] - baixo[colunas]),
+                        colunas)
+        passo[colunas] = np.where(abaixo == lado[colunas], 2 * passo[colunas], 1)
+        lado[colunas] = abaixo
+    # os pares contados em alto e não em baixo trocam de ordem entre x - baixo t
+    # e x - alto t e são vizinhos na primeira ordem; a inclinação desses pares
+    # (um só, salvo empates) é a k-ésima, sem o arredondamento da bissecção
+    postos_alto = _permutacao(valores - alto * tempo)[0]
+    ordem = _permutacao(valores - baixo * tempo)[1]
+    troca = np.diff(np.take_along_axis(postos_alto, ordem, axis=0), axis=0) < 0
+    x = np.take_along_axis(valores, ordem, axis=0)
+    t = np.take_along_axis(tempo, ordem, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vizinhas = np.where(troca, np.diff(x, axis=0) / np.diff(t, axis=0), np.inf)
+    exata = vizinhas.min(axis=0) if len(vizinhas) else np.full(len(k), np.inf)
+    return np.where(np.isfinite(exata), exata, (baixo + alto) / 2)
+
+
+def _sen(valores, tempo, n, variancia=None, alfa=0.05):
+    # inclinação mediana e, com a variância de S, o intervalo de confiança.
+    # Até PARES_SEN pares por coluna as estatísticas de ordem saem dos pares;
+    # acima disso, de uma única bissecção para todas
+    from scipy.special import ndtri
+    pares = n * (n - 1) // 2
+    k = [(pares + 1) // 2, pares // 2 + 1]
+    if variancia is not None:
+        C = ndtri(1 - alfa / 2) * np.sqrt(variancia)
+        k += [np.round((pares - C) / 2), np.round((pares + C) / 2) + 1]
+    k = np.clip(np.array(k, dtype=np.float64), 1, np.maximum(pares, 1))
+    b = np.full(k.shape, np.nan)
+    direto = pares <= PARES_SEN
+    b[:, direto] = _pares(valores[:, direto], tempo[:, direto], n[direto], k[:, direto])
+    longas = np.flatnonzero(~direto & (pares > 0))
+    if longas.size:
+        copias = len(k)
+        b[:, longas] = _bisseccao(np.tile(valores[:, longas], copias),
+                                  np.tile(tempo[:, longas], copias),
+                                  np.tile(n[longas], copias),
+                                  k[:, longas].ravel()).reshape(copias, -1)
+    return ((b[0] + b[1]) / 2,) + tuple(b[2:])
+
+
+def _autocorrelacao(valores, tempo, n, inclinacao, alfa):
+    # razão n/n* de Hamed e Rao (1998): autocorrelações significativas dos
+    # postos da série sem tendência, por FFT
+    from scipy.special import ndtri
+    valido = np.arange(len(valores))[:, np.newaxis] < n
+    residuo = np.where(valido, valores - inclinacao * tempo, np.nan)
+    _, ordem = _permutacao(residuo)
+    postos = np.empty_like(residuo)
+    np.put_along_axis(postos, ordem, _empates(residuo, ordem)[2], axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = np.where(valido, postos - (n + 1) / 2, 0)
+        tamanho = 1 << (2 * len(r) - 1).bit_length()
+        espectro = np.fft.rfft(r, tamanho, axis=0)
+        rho = np.fft.irfft(espectro * espectro.conj(), tamanho, axis=0)[:len(r)]
+        rho = rho / rho[0]
+        lag = np.arange(len(r))[:, np.newaxis]
+        peso = (n - lag) * (n - lag - 1) * (n - lag - 2)
+        significativa = (lag > 0) & (lag < n) & (np.abs(rho) > ndtri(1 - alfa / 2) /
+                                                 np.sqrt(n))
+        soma = np.where(significativa, peso * rho, 0).sum(axis=0)
+        return 1 + 2 * soma / (n * (n - 1) * (n - 2))
+
+
+def _mann_kendall(valores, tempo, n, autocorrelacao, alfa, alternativa,
+                  inclinacao=None):
+    from scipy.special import ndtr
+    if alternativa not in ALTERNATIVAS:
+        raise ValueError('alternativa deve ser uma de %s' % (ALTERNATIVAS,))
+    S, correcao = _estatistica_s(valores, n)
+    variancia = (n * (n - 1) * (2 * n + 5) - correcao) / 18
+    if autocorrelacao:
+        if inclinacao is None:
+            inclinacao = _sen(valores, tempo, n)[0]
+        variancia = variancia * _autocorrelacao(valores, tempo, n, inclinacao, alfa)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        Z = (S - np.sign(S)) / np.sqrt(variancia)
+        tau = S / (n * (n - 1) / 2)
+    return {'n': n, 'S': S, 'var_S': variancia, 'Z': Z,
+            'p': _valor_p(ndtr(Z), ndtr(-Z), alternativa), 'tau': tau}
+
+
+def mann_kendall(series, tempo=None, autocorrelacao=False, alfa=0.05,
+                 alternativa='bilateral'):
+    """Teste de tendência de Mann-Kendall de cada coluna.
+
+    series é uma Series, um DataFrame (uma coluna por série) ou um arranjo;
+    o tempo é o índice, se numérico (anos), ou a posição. Falhas são
+    ignoradas. A variância de S é corrigida para os empates e, com
+    autocorrelacao=True, pela razão n/n* de Hamed e Rao, com as
+    autocorrelações dos postos da série sem a tendência de Sen
+    significativas ao nível alfa. Retorna um DataFrame por coluna com n, S,
+    var_S, Z, p e o tau de Kendall.
+    """
+    valores, tempo, n, colunas = _preparar(series, tempo)
+    return pd.DataFrame(_mann_kendall(valores, tempo, n, autocorrelacao, alfa,
+                                      alternativa), index=colunas)
+
+
+def _sen_tabela(valores, tempo, n, alfa):
+    correcao = _empates(valores, np.argsort(valores, axis=0, kind='stable'))[1]
+    variancia = (n * (n - 1) * (2 * n + 5) - correcao) / 18
+    inclinacao, inferior, superior = _sen(valores, tempo, n, variancia, alfa)
+    intercepto = np.full(len(n), np.nan)
+    cheias = n > 0
+    intercepto[cheias] = np.nanmedian(valores[:, cheias] - inclinacao[cheias] *
+                                      tempo[:, cheias], axis=0)
+    return {'n': n, 'inclinacao': inclinacao, 'intercepto': intercepto,
+            'inferior': inferior, 'superior': superior}
+
+
+def sen(series, tempo=None, alfa=0.05):
+    """Inclinação de Sen de cada coluna, com intervalo de confiança 1 - alfa.
+
+    A inclinação é a mediana de (x_j - x_i) / (t_j - t_i) para i < j, e o
+    intercepto a mediana de x - inclinacao * t. O intervalo de confiança
+    (inferior, superior) usa a variância de S com correção para empates.
+    """
+    valores, tempo, n, colunas = _preparar(series, tempo)
+    return pd.DataFrame(_sen_tabela(valores, tempo, n, alfa), index=colunas)
+
+
+def pettitt(series, tempo=None):
+    """Teste de Pettitt para um ponto de mudança em cada coluna.
+
+    U_t = 2 (soma dos postos até t) - t (n + 1), K = max |U_t| e o valor p
+    aproximado é 2 exp(-6 K² / (n³ + n²)). ponto é o tempo da última
+    observação antes da mudança.
+    """
+    valores, tempo, n, colunas = _preparar(series, tempo)
+    return pd.DataFrame(_pettitt(valores, tempo, n), index=colunas)
+
+
+def _pettitt(valores, tempo, n):
+    _, ordem = _permutacao(valores)
+    postos = np.empty_like(valores)
+    np.put_along_axis(postos, ordem, _empates(valores, ordem)[2], axis=0)
+    t = np.arange(1, len(valores) + 1)[:, np.newaxis]
+    U = np.abs(2 * np.cumsum(np.where(t <= n, postos, 0), axis=0) - t * (n + 1))
+    U = np.where(t < n, U, -1)
+    posicao = U.argmax(axis=0)
+    K = np.where(n > 1, U[posicao, np.arange(len(n))], np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = np.minimum(2 * np.exp(-6 * K ** 2 / (n ** 3 + n ** 2)), 1)
+    ponto = np.where(n > 1, tempo[posicao, np.arange(len(n))], np.nan)
+    return {'n': n, 'K': K, 'ponto': ponto, 'p': p}
+
+
+def tendencias(series, tempo=None, autocorrelacao=False, alfa=0.05,
+               alternativa='bilateral'):
+    """Mann-Kendall, inclinação de Sen e Pettitt de cada coluna em uma tabela.
+
+    A preparação das séries e a inclinação de Sen são compartilhadas pelos
+    três testes. As colunas de Pettitt têm o sufixo _pettitt.
+    """
+    valores, tempo, n, colunas = _preparar(series, tempo)
+    inclinacao = _sen_tabela(valores, tempo, n, alfa)
+    tabela = _mann_kendall(valores, tempo, n, autocorrelacao, alfa, alternativa,
+                           inclinacao['inclinacao'])
+    tabela.update((nome, inclinacao[nome])
+                  for nome in ('inclinacao', 'intercepto', 'inferior', 'superior'))
+    mudanca = _pettitt(valores, tempo, n)
+    tabela.update((nome + '_pettitt', mudanca[nome]) for nome in ('K', 'ponto', 'p'))
+    return pd.DataFrame(tabela, index=colunas)
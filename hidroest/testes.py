@@ -0,0 +1,196 @@
+# coding: utf-8
+"""Testes de hipóteses paramétricos em lote, a partir de estatísticas resumo.
+
+Os testes das células In[90] a In[102] (t e z de uma amostra, t de Student e
+de Welch para duas amostras, qui-quadrado da variância e F da razão de
+variâncias) dependem apenas do tamanho, da média e da variância de cada
+amostra. Essas estatísticas (Suficientes) são calculadas uma única vez, com
+reduções vetorizadas sobre todas as colunas (Jan a Dez) de todas as
+estações, e as estatísticas de teste e os valores p de todos os testes saem
+de operações sobre esses vetores (testar), com as funções de distribuição do
+scipy.special. As estatísticas do período todo são a combinação das dos dois
+subperíodos, sem nova passada pelos dados.
+
+Os testes são bilaterais, salvo indicação de alternativa='maior' ou 'menor'.
+"""
+
+from __future__ import division
+
+import numpy as np
+import pandas as pd
+
+from hidroest.suficientes import Periodos, Suficientes, suficientes_planilha
+
+MESES = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out',
+         'Nov', 'Dez']
+TESTES = ('t', 'z', 'qui2', 'student', 'welch', 'f')
+ALTERNATIVAS = ('bilateral', 'maior', 'menor')
+
+
+def _valor_p(cdf, sf, alternativa):
+    if alternativa == 'bilateral':
+        return np.minimum(2 * np.minimum(cdf, sf), 1)
+    return sf if alternativa == 'maior' else cdf
+
+
+def _tabelas(tabelas):
+    if isinstance(tabelas, pd.DataFrame):
+        return {0: tabelas}
+    return dict(tabelas)
+
+
+def _colunas(tabelas, colunas, divisao, coluna_ano):
+    # arranjos (anos x pares estação-coluna) completados com NaN: sem divisao
+    # a amostra inteira; com divisao, os anos <= divisao e os posteriores
+    pares, todos, antes, depois = [], [], [], []
+    for estacao, tabela in tabelas.items():
+        nomes = colunas or [m for m in MESES if m in tabela.columns]
+        valores = tabela[nomes].to_numpy(dtype=np.float64)
+        pares.extend((estacao, c) for c in nomes)
+        if divisao is None:
+            todos.extend(valores.T)
+        else:
+            ate = (tabela[coluna_ano] <= divisao).to_numpy()[:, np.newaxis]
+            antes.extend(np.where(ate, valores, np.nan).T)
+            depois.extend(np.where(ate, np.nan, valores).T)
+    indice = pd.MultiIndex.from_tuples(pares, names=['estacao', 'coluna'])
+
+    def empilhar(vetores):
+        if not vetores:
+            return None
+        tamanho = max(len(v) for v in vetores)
+        saida = np.full((tamanho, len(vetores)), np.nan)
+        for j, v in enumerate(vetores):
+            saida[:len(v), j] = v
+        return saida
+
+    return indice, empilhar(todos), empilhar(antes), empilhar(depois)
+
+
+def _parametro(valor, indice):
+    # escalar ou dicionário/Series por nome de coluna (Jan, Fev...)
+    if isinstance(valor, (dict, pd.Series)):
+        return pd.Series(valor).reindex(indice.get_level_values(-1)).to_numpy(
+            dtype=np.float64)
+    return np.float64(valor)
+
+
+def bateria(tabelas, media=None, desvio=None, variancia=None, divisao=None,
+            delta=0.0, testes=None, colunas=None, coluna_ano='Ano',
+            alternativa='bilateral'):
+    """Aplica os testes a todas as colunas de todas as estações de uma vez.
+
+    tabelas é uma tabela mensal como VMM_ParaopebaAnoCivil.xlsx (uma linha
+    por ano e as colunas Jan a Dez) ou um dicionário {estação: tabela};
+    colunas restringe as colunas testadas (padrão: os meses presentes).
+    Com divisao, os anos <= divisao formam a amostra X e os posteriores a
+    amostra Y. tabelas também pode ser o nome da planilha, cujas
+    estatísticas vêm do cache de suficientes_planilha, ou as Suficientes
+    (ou os Periodos) já calculadas; nesses casos os dados não são relidos.
+    Os demais parâmetros são os de testar.
+    """
+    if isinstance(tabelas, str):
+        tabelas = suficientes_planilha(tabelas, colunas or MESES, divisao, coluna_ano)
+    if isinstance(tabelas, Suficientes):
+        tabelas = Periodos(tabelas, None, None)
+    if isinstance(tabelas, Periodos):
+        amostra, x, y = tabelas
+    else:
+        indice, amostra, X, Y = _colunas(_tabelas(tabelas), colunas, divisao,
+                                         coluna_ano)
+        if divisao is None:
+            amostra, x, y = Suficientes.de_valores(amostra, indice), None, None
+        else:
+            x = Suficientes.de_valores(X, indice)
+            y = Suficientes.de_valores(Y, indice)
+            amostra = x + y
+    return testar(amostra, x, y, media, desvio, variancia, delta, testes, alternativa)
+
+
+def testar(amostra, x=None, y=None, media=None, desvio=None, variancia=None,
+           delta=0.0, testes=None, alternativa='bilateral'):
+    """Testes de hipóteses a partir das estatísticas suficientes.
+
+    amostra, x e y são Suficientes com as mesmas colunas (x e y são as duas
+    amostras dos testes de duas amostras, por exemplo os períodos de
+    suficientes_planilha). Os testes disponíveis dependem dos parâmetros:
+
+    - media: t de uma amostra (H0: média = media) e, com desvio (desvio
+      padrão populacional conhecido), o teste z;
+    - variancia: qui-quadrado (H0: variância = variancia);
+    - x e y: Student (variâncias iguais) e Welch (H0: média X - média Y =
+      delta) e F (H0: variância X / variância Y = 1).
+
+    media, desvio e variancia podem ser escalares ou dicionários por coluna.
+    testes seleciona um subconjunto de TESTES. Retorna um DataFrame com uma
+    linha por teste e coluna: estatistica, graus de liberdade (gl1, gl2) e
+    valor p.
+    """
+    from scipy import special
+
+    if alternativa not in ALTERNATIVAS:
+        raise ValueError('alternativa deve ser uma de %s' % (ALTERNATIVAS,))
+    if testes is None:
+        testes = []
+        if media is not None:
+            testes += ['t', 'z'] if desvio is not None else ['t']
+        if variancia is not None:
+            testes.append('qui2')
+        if y is not None:
+            testes += ['student', 'welch', 'f']
+    desconhecidos = set(testes) - set(TESTES)
+    if desconhecidos:
+        raise ValueError('testes desconhecidos: %s' % sorted(desconhecidos))
+    indice = amostra.colunas
+    a = amostra
+    resultados = []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for teste in testes:
+            gl2 = np.full(len(indice), np.nan)
+            if teste in ('t', 'z'):
+                if media is None:
+                    raise ValueError('o teste %s requer a media' % teste)
+                mu = _parametro(media, indice)
+            elif teste != 'qui2' and y is None:
+                raise ValueError('o teste %s requer as amostras x e y' % teste)
+            if teste == 't':
+                gl1 = a.n - 1.0
+                estatistica = (a.media - mu) / np.sqrt(a.variancia / a.n)
+                cdf = special.stdtr(gl1, estatistica)
+                sf = special.stdtr(gl1, -estatistica)
+            elif teste == 'z':
+                if desvio is None:
+                    raise ValueError('o teste z requer o desvio populacional')
+                gl1 = np.full(len(indice), np.nan)
+                estatistica = (a.media - mu) / (_parametro(desvio, indice) / np.sqrt(a.n))
+                cdf = special.ndtr(estatistica)
+                sf = special.ndtr(-estatistica)
+            elif teste == 'qui2':
+                if variancia is None:
+                    raise ValueError('o teste qui2 requer a variancia')
+                gl1 = a.n - 1.0
+                estatistica = gl1 * a.variancia / _parametro(variancia, indice)
+                cdf = special.chdtr(gl1, estatistica)
+                sf = special.chdtrc(gl1, estatistica)
+            elif teste in ('student', 'welch'):
+                vx, vy = x.variancia / x.n, y.variancia / y.n
+                if teste == 'student':
+                    gl1 = x.n + y.n - 2.0
+                    combinada = ((x.n - 1) * x.variancia + (y.n - 1) * y.variancia) / gl1
+                    erro = np.sqrt(combinada * (1 / x.n + 1 / y.n))
+                else:
+                    gl1 = (vx + vy) ** 2 / (vx ** 2 / (x.n - 1) + vy ** 2 / (y.n - 1))
+                    erro = np.sqrt(vx + vy)
+                estatistica = (x.media - y.media - delta) / erro
+                cdf = special.stdtr(gl1, estatistica)
+                sf = special.stdtr(gl1, -estatistica)
+            else:
+                gl1, gl2 = x.n - 1.0, y.n - 1.0
+                estatistica = x.variancia / y.variancia
+                cdf = special.fdtr(gl1, gl2, estatistica)
+                sf = special.fdtrc(gl1, gl2, estatistica)
+            tabela = pd.DataFrame({'estatistica': estatistica, 'gl1': gl1, 'gl2': gl2,
+                                   'p': _valor_p(cdf, sf, alternativa)}, index=indice)
+            tabela.insert(0, 'teste', teste)
+            resultados.append(tabela)
+    return pd.concat(resultados).reset_index()